@@ -1,11 +1,98 @@
+import argparse
+import logging
+import time
+
 from _db import database
 from settings import CONFIG
 
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+FILM_TABLES = ["episode", "movie"]
+
+
+def get_film_condition(post_type: str = "", since: str = "", until: str = "") -> str:
+    conditions = []
+    if post_type:
+        conditions.append(f"type='{post_type}'")
+    if since:
+        conditions.append(f"time >= '{since}'")
+    if until:
+        conditions.append(f"time < '{until}'")
+
+    return " AND ".join(conditions) or "1=1"
+
+
+def chunked_delete(
+    table: str, condition: str = "1=1", chunk_size: int = 1000, pause: float = 0.1
+) -> int:
+    total = 0
+    while True:
+        deleted = database.delete_chunk(
+            table=table, condition=condition, limit=chunk_size
+        )
+        total += deleted
+        logging.info(f"[-] {table}: deleted {total} rows")
+        if deleted < chunk_size:
+            break
+        time.sleep(pause)
+
+    return total
+
+
+def truncate_all(tables: list, chunk_size: int, pause: float):
+    try:
+        database.truncate(tables)
+        logging.info(f"[-] Truncated {', '.join(tables)}")
+    except Exception as e:
+        logging.info(f"TRUNCATE not allowed ({e}). Falling back to chunked delete")
+        for table in tables:
+            chunked_delete(table, chunk_size=chunk_size, pause=pause)
+
+
+def reset_films(condition: str, chunk_size: int, pause: float):
+    film_ids = f"SELECT id FROM {CONFIG.TABLE_PREFIX}movie WHERE {condition}"
+    chunked_delete(
+        "episode",
+        condition=f"movie_id IN ({film_ids})",
+        chunk_size=chunk_size,
+        pause=pause,
+    )
+    chunked_delete("movie", condition=condition, chunk_size=chunk_size, pause=pause)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Reset crawler tables")
+    parser.add_argument(
+        "--mode",
+        choices=["truncate", "delete"],
+        default="truncate",
+        help="truncate: fast reset with FK checks disabled; delete: chunked DELETE",
+    )
+    parser.add_argument("--type", default="", help="Only reset this post type")
+    parser.add_argument("--since", default="", help="Only reset films with time >= ")
+    parser.add_argument("--until", default="", help="Only reset films with time < ")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument(
+        "--pause", type=float, default=0.1, help="Seconds to sleep between chunks"
+    )
+    return parser.parse_args()
+
 
 def main():
-    tables = CONFIG.INSERT.keys()
-    for table in tables:
-        database.delete_from(table=table)
+    args = get_args()
+    tables = list(CONFIG.INSERT.keys())
+
+    if args.type or args.since or args.until:
+        condition = get_film_condition(args.type, args.since, args.until)
+        logging.info(f"Resetting {', '.join(FILM_TABLES)} WHERE {condition}")
+        reset_films(condition, chunk_size=args.chunk_size, pause=args.pause)
+        return
+
+    if args.mode == "truncate":
+        truncate_all(tables, chunk_size=args.chunk_size, pause=args.pause)
+    else:
+        for table in tables:
+            chunked_delete(table, chunk_size=args.chunk_size, pause=args.pause)
 
 
 if __name__ == "__main__":
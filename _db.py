@@ -2,11 +2,12 @@ import sys
 
 import mysql.connector
 
+from metrics import metrics
 from settings import CONFIG
 
 
 class Database:
-    def get_conn(self):
+    def get_conn(self, **kwargs):
         try:
             return mysql.connector.connect(
                 user=CONFIG.user,
@@ -14,11 +15,13 @@ class Database:
                 host=CONFIG.host,
                 port=CONFIG.port,
                 database=CONFIG.database,
+                **kwargs,
             )
         except Exception as e:
             print(f"Error connecting to MariaDB Platform: {e}")
             sys.exit(1)
 
+    @metrics.db_call
     def select_with(self, query: str) -> list:
         conn = self.get_conn()
         cur = conn.cursor()
@@ -29,6 +32,7 @@ class Database:
 
         return res
 
+    @metrics.db_call
     def select_all_from(self, table: str, condition: str = "1=1", cols: str = "*"):
         conn = self.get_conn()
         cur = conn.cursor()
@@ -41,6 +45,7 @@ class Database:
 
         return res
 
+    @metrics.db_call
     def insert_into(self, table: str, data: tuple = None, is_bulk: bool = False):
         conn = self.get_conn()
         cur = conn.cursor()
@@ -60,6 +65,7 @@ class Database:
         conn.close()
         return id
 
+    @metrics.db_call
     def update_table(
         self, table: str, set_cond: str, where_cond: str, data: tuple = ()
     ):
@@ -73,6 +79,7 @@ class Database:
         cur.close()
         conn.close()
 
+    @metrics.db_call
     def delete_from(self, table: str = "", condition: str = "1=1"):
         conn = self.get_conn()
         cur = conn.cursor()
@@ -81,6 +88,37 @@ class Database:
         cur.close()
         conn.close()
 
+    @metrics.db_call
+    def delete_chunk(
+        self, table: str = "", condition: str = "1=1", limit: int = 1000
+    ) -> int:
+        conn = self.get_conn()
+        cur = conn.cursor()
+        cur.execute(
+            f"DELETE FROM {CONFIG.TABLE_PREFIX}{table} WHERE {condition} LIMIT {int(limit)}"
+        )
+        deleted = cur.rowcount
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        return deleted
+
+    @metrics.db_call
+    def truncate(self, tables: list, disable_fk_checks: bool = True):
+        conn = self.get_conn()
+        cur = conn.cursor()
+        try:
+            if disable_fk_checks:
+                cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for table in tables:
+                cur.execute(f"TRUNCATE TABLE {CONFIG.TABLE_PREFIX}{table}")
+        finally:
+            if disable_fk_checks:
+                cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+            cur.close()
+            conn.close()
+
     def select_or_insert(self, table: str, condition: str, data: tuple):
         res = self.select_all_from(table=table, condition=condition)
         if not res:
@@ -89,7 +127,12 @@ class Database:
         return res
 
 
-database = Database()
+if getattr(CONFIG, "DB_BACKEND", "mysql") == "sqlite":
+    from _sqlite_db import SQLiteDatabase
+
+    database = SQLiteDatabase(getattr(CONFIG, "SQLITE_PATH", ":memory:"))
+else:
+    database = Database()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from metrics import metrics
+from settings import CONFIG
+
+PRIMARY_KEYS = {
+    "posts": "ID",
+    "terms": "term_id",
+    "term_taxonomy": "term_taxonomy_id",
+    "postmeta": "meta_id",
+    "term_relationships": "",
+}
+
+
+class SQLiteDatabase:
+    """Local stand-in for _db.Database.
+
+    Emulates the tables from CONFIG.INSERT on SQLite so the ingestion path can
+    be profiled without MariaDB. Every statement and round trip is counted,
+    in total and, inside `measure(label)`, per film.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.stats = Counter()
+        self.film_stats = {}
+        self.local = threading.local()
+        self.create_tables()
+
+    def get_table_name(self, table: str) -> str:
+        return f"{CONFIG.TABLE_PREFIX}{table}"
+
+    def get_primary_key(self, table: str) -> str:
+        if CONFIG.TABLE_PREFIX and table.startswith(CONFIG.TABLE_PREFIX):
+            table = table[len(CONFIG.TABLE_PREFIX) :]
+        return PRIMARY_KEYS.get(table, "id")
+
+    def create_tables(self):
+        for table, columns in CONFIG.INSERT.items():
+            primary_key = self.get_primary_key(table)
+            cols = [col for col in columns if col != primary_key]
+            if primary_key:
+                cols.insert(0, f"{primary_key} INTEGER PRIMARY KEY AUTOINCREMENT")
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.get_table_name(table)} ({', '.join(cols)})"
+            )
+        self.conn.commit()
+
+    def execute(self, query: str, data=(), is_bulk: bool = False):
+        query = query.replace("%s", "?")
+        self.count("round_trips")
+        self.count("statements")
+        if is_bulk:
+            return self.conn.executemany(query, data)
+        return self.conn.execute(query, data or ())
+
+    def commit(self):
+        self.count("round_trips")
+        self.conn.commit()
+
+    def call(self, method: str):
+        # One connection per call, like _db.Database
+        self.count("round_trips")
+        self.count(f"calls.{method}")
+
+    def count(self, key: str):
+        self.stats[key] += 1
+        label = getattr(self.local, "label", None)
+        if label is not None:
+            self.film_stats.setdefault(label, Counter())[key] += 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = Counter()
+            self.film_stats = {}
+
+    @contextmanager
+    def measure(self, label: str):
+        """Counts this thread's statements under film_stats[label] and yields
+        that Counter. Work for the same film on another thread (a cover or
+        pipeline worker) adds to it by measuring the same label."""
+        with self.lock:
+            stats = self.film_stats.setdefault(label, Counter())
+        previous = getattr(self.local, "label", None)
+        self.local.label = label
+        try:
+            yield stats
+        finally:
+            self.local.label = previous
+
+    @metrics.db_call
+    def select_with(self, query: str) -> list:
+        with self.lock:
+            self.call("select_with")
+            return self.execute(query).fetchall()
+
+    @metrics.db_call
+    def select_all_from(self, table: str, condition: str = "1=1", cols: str = "*"):
+        with self.lock:
+            self.call("select_all_from")
+            return self.execute(
+                f"SELECT {cols} FROM {self.get_table_name(table)} WHERE {condition}"
+            ).fetchall()
+
+    @metrics.db_call
+    def insert_into(self, table: str, data: tuple = None, is_bulk: bool = False):
+        with self.lock:
+            self.call("insert_into")
+            columns = f"({', '.join(CONFIG.INSERT[table])})"
+            values = f"({', '.join(['%s'] * len(CONFIG.INSERT[table]))})"
+            query = (
+                f"INSERT INTO {self.get_table_name(table)} {columns} VALUES {values}"
+            )
+            cur = self.execute(query, data, is_bulk=is_bulk)
+            self.commit()
+            return 0 if is_bulk else cur.lastrowid
+
+    @metrics.db_call
+    def update_table(
+        self, table: str, set_cond: str, where_cond: str, data: tuple = ()
+    ):
+        with self.lock:
+            self.call("update_table")
+            self.execute(
+                f"UPDATE {self.get_table_name(table)} set {set_cond} WHERE {where_cond}",
+                data,
+            )
+            self.commit()
+
+    @metrics.db_call
+    def delete_from(self, table: str = "", condition: str = "1=1"):
+        with self.lock:
+            self.call("delete_from")
+            self.execute(f"DELETE FROM {self.get_table_name(table)} WHERE {condition}")
+            self.commit()
+
+    @metrics.db_call
+    def delete_chunk(
+        self, table: str = "", condition: str = "1=1", limit: int = 1000
+    ) -> int:
+        with self.lock:
+            self.call("delete_chunk")
+            table = self.get_table_name(table)
+            cur = self.execute(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} WHERE {condition} LIMIT {int(limit)})"
+            )
+            self.commit()
+            return cur.rowcount
+
+    def truncate(self, tables: list, disable_fk_checks: bool = True):
+        for table in tables:
+            self.delete_from(table)
+
+    def select_or_insert(self, table: str, condition: str, data: tuple):
+        res = self.select_all_from(table=table, condition=condition)
+        if not res:
+            self.insert_into(table, data)
+            res = self.select_all_from(table, condition=condition)
+        return res
@@ -6,38 +6,88 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup
 
+from film_export import film_exporter
 from hdtoday import HDToday
 from helper import helper
+from memory_guard import memory_guard
+from metrics import metrics
+from mirrors import mirror_pool
+from page_archive import page_archive
+from profiler import profiler
+from records import FilmRecord
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 Path(CONFIG.COVER_SAVE_PATH).mkdir(parents=True, exist_ok=True)
 
 
+def get_flw_item_label(self, flw_item, *args, **kwargs) -> tuple:
+    href = flw_item.find("a").get("href")
+    return href.strip("/").split("/")[-1], href
+
+
 class Crawler:
-    def crawl_soup(self, url):
-        logging.info(f"Crawling {url}")
+    def __init__(self, mode: str = ""):
+        # "insert" writes through HDToday; "export" streams JSONL for load_export.py
+        self.mode = mode or getattr(CONFIG, "CRAWL_MODE", "insert")
 
-        html = helper.download_url(url)
-        soup = BeautifulSoup(html.content, "html.parser")
+    def fetch_page(self, url, kind: str = "") -> bytes:
+        logging.info(f"Crawling {url}")
 
-        return soup
+        try:
+            with metrics.timer("fetch_seconds"):
+                html = helper.download_url(url)
+        except Exception:
+            metrics.inc("fetch_total", status="error")
+            raise
+        metrics.inc("fetch_bytes_total", len(html.content))
+        metrics.inc("fetch_total", status=html.status_code)
+
+        if kind and kind in getattr(CONFIG, "ARCHIVE_KINDS", []):
+            page_archive.add(url, html.content, kind=kind)
+
+        return html.content
+
+    def parse_page(self, content: bytes) -> BeautifulSoup:
+        with metrics.timer("parse_seconds"):
+            return BeautifulSoup(content, "html.parser")
+
+    def crawl_soup(self, url, kind: str = ""):
+        return self.parse_page(self.fetch_page(url, kind=kind))
+
+    def release(self, tag) -> None:
+        """Decomposes the whole tree `tag` belongs to once values are extracted.
+
+        Parse trees are cyclic (parent/child/sibling links), so without this
+        they wait for a full gc pass, and any NavigableString kept by mistake
+        pins its entire page.
+        """
+        if tag is None:
+            return
+        while tag.parent is not None:
+            tag = tag.parent
+        tag.decompose()
 
     def get_episode_link(self, href) -> str:
-        soup = self.crawl_soup(href)
-        playerMovie = soup.find("div", {"id": "playerMovie"})
-        src = playerMovie.find("iframe").get("src")
-        return src
+        soup = self.crawl_soup(href, kind="episode")
+        try:
+            playerMovie = soup.find("div", {"id": "playerMovie"})
+            src = playerMovie.find("iframe").get("src")
+            return src
+        finally:
+            self.release(soup)
 
     def get_server_episodes_links(self, href, server_data_id) -> dict:
         res = {}
-        soup = self.crawl_soup(href)
+        soup = self.crawl_soup(href, kind="episodes")
         list_episodes = soup.find("ul", class_="list-episodes")
-        lis = list_episodes.find_all("li", class_="episode-item")
-        for li in lis:
-            episode_name = li.text.strip()
-            episode_href = li.find("a").get("href")
+        episode_hrefs = [
+            (li.text.strip(), li.find("a").get("href"))
+            for li in list_episodes.find_all("li", class_="episode-item")
+        ]
+        self.release(soup)
 
+        for episode_name, episode_href in episode_hrefs:
             if not f"&server={int(server_data_id) + 1}" in episode_href:
                 matches = re.search(r"&server=(\d+)&", episode_href)
                 if matches:
@@ -54,7 +104,7 @@ class Crawler:
     def get_episodes_data(
         self, href: str, post_type: str = CONFIG.TYPE_TV_SHOWS
     ) -> dict:
-        soup = self.crawl_soup(href)
+        soup = self.crawl_soup(href, kind="servers")
         res = {}
 
         try:
@@ -96,6 +146,8 @@ class Crawler:
                 f"Failed to get_episodes_data. Href: {href}",
                 log_file="base.episodes.log",
             )
+        finally:
+            self.release(soup)
 
         return res
 
@@ -104,22 +156,29 @@ class Crawler:
         slug: str,
         href: str,
         post_type: str = CONFIG.TYPE_TV_SHOWS,
+        soup: BeautifulSoup = None,
     ):
-        soup = self.crawl_soup(href)
-        detail_page_infor = soup.find("div", class_="detail_page-infor")
+        if soup is None:
+            soup = self.crawl_soup(href, kind="detail")
+        try:
+            detail_page_infor = soup.find("div", class_="detail_page-infor")
 
-        title = helper.get_title(href=href, detail_page_infor=detail_page_infor)
-        description = helper.get_description(
-            href=href, detail_page_infor=detail_page_infor
-        )
+            title = helper.get_title(href=href, detail_page_infor=detail_page_infor)
+            description = helper.get_description(
+                href=href, detail_page_infor=detail_page_infor
+            )
 
-        cover_src = helper.get_cover_url(href=href, detail_page_infor=detail_page_infor)
+            cover_src = helper.get_cover_url(
+                href=href, detail_page_infor=detail_page_infor
+            )
 
-        trailer_id = helper.get_trailer_id(soup)
+            trailer_id = helper.get_trailer_id(soup)
 
-        servers_link = helper.get_servers_link(soup)
+            servers_link = helper.get_servers_link(soup)
 
-        extra_info = helper.get_extra_info(detail_page_infor=detail_page_infor)
+            extra_info = helper.get_extra_info(detail_page_infor=detail_page_infor)
+        finally:
+            self.release(soup)
 
         if not title:
             helper.error_log(
@@ -127,61 +186,76 @@ class Crawler:
             )
             return
 
-        film_data = {
-            "title": title,
-            "slug": slug,
-            "description": description,
-            "post_type": post_type,
-            "trailer_id": trailer_id,
-            "cover_src": cover_src,
-            "servers_link": servers_link,
-            "extra_info": extra_info,
-        }
+        film_data = FilmRecord(
+            title=title,
+            slug=slug,
+            href=href,
+            description=description,
+            post_type=post_type,
+            trailer_id=trailer_id,
+            cover_src=cover_src,
+            servers_link=servers_link,
+            extra_info=extra_info,
+        )
 
         episodes_data = []
 
         return film_data, episodes_data
 
+    @profiler.profile_film(get_flw_item_label)
     def crawl_ml_item(
         self, flw_item: BeautifulSoup, post_type: str = CONFIG.TYPE_TV_SHOWS
     ):
         try:
-            href = flw_item.find("a").get("href")
+            with metrics.film(post_type):
+                href = flw_item.find("a").get("href")
 
-            if not href.startswith("https://"):
-                href = CONFIG.FMOVIERS_HOMEPAGE + href
+                if not href.startswith("https://"):
+                    href = CONFIG.FMOVIERS_HOMEPAGE + href
+                href = mirror_pool.canonicalize(href)
 
-            slug = href.strip("/").split("/")[-1]
+                slug = href.strip("/").split("/")[-1]
 
-            film_data, episodes_data = self.crawl_film(
-                slug=slug,
-                href=href,
-                post_type=post_type,
-            )
+                film_data, episodes_data = self.crawl_film(
+                    slug=slug,
+                    href=href,
+                    post_type=post_type,
+                )
 
-            film_data["episodes_data"] = episodes_data
+                film_data.episodes_data = episodes_data
 
-            # with open("json/crawled.json", "w") as f:
-            #     f.write(json.dumps(film_data, indent=4, ensure_ascii=False))
+                # with open("json/crawled.json", "w") as f:
+                #     f.write(json.dumps(film_data, indent=4, ensure_ascii=False))
 
-            HDToday(film=film_data, episodes=episodes_data).insert_film()
-            # sys.exit(0)
+                film = HDToday(film=film_data, episodes=episodes_data)
+                if self.mode == "export":
+                    film_exporter.write(film.get_record())
+                else:
+                    film.insert_film()
+                # sys.exit(0)
 
         except Exception as e:
             helper.error_log(
                 msg=f"Error crawl_flw_item\n{e}", log_file="base.crawl_flw_item.log"
             )
 
-    def crawl_page(self, url, post_type: str = CONFIG.TYPE_TV_SHOWS):
+    def get_flw_items(self, url) -> list:
         soup = self.crawl_soup(url)
+        return soup.find_all("div", class_="flw-item")
 
-        flw_items = soup.find_all("div", class_="flw-item")
+    def crawl_page(self, url, post_type: str = CONFIG.TYPE_TV_SHOWS):
+        flw_items = self.get_flw_items(url)
         if not flw_items:
             return 0
 
-        for flw_item in flw_items:
-            self.crawl_ml_item(flw_item=flw_item, post_type=post_type)
-            # break
+        try:
+            for flw_item in flw_items:
+                self.crawl_ml_item(flw_item=flw_item, post_type=post_type)
+                if memory_guard.check():
+                    break
+                # break
+        finally:
+            self.release(flw_items[0])
 
         return 1
 
@@ -0,0 +1,218 @@
+"""Compares the HTTP_BACKEND clients on the same request mix at equal
+concurrency: the default requests backend against a compressing FakeOrigin
+(HTTP/1.1), and the http2 backend against FakeH2Origin (h2c):
+
+    python -m benchmarks.bench_http --requests 2000 --concurrency 1,8,32 --rtt 0.02
+
+Both origins sit behind a relay that counts the bytes on the wire (headers,
+framing and bodies, both ways) and adds --rtt: half on each direction's data,
+a full one on every new connection for the TCP handshake. TLS is left out,
+which flatters the requests backend: over https each new connection costs
+another one or two round trips. Needs httpx[http2,brotli].
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_h2_origin import FakeH2Origin
+from benchmarks.fake_origin import FakeOrigin
+from http_client import Http2Backend, RequestsBackend, brotli
+
+
+class CountingRelay:
+    """TCP relay to (host, port) that counts bytes and adds round-trip time."""
+
+    def __init__(self, host: str, port: int, rtt: float = 0.0):
+        self.target = (host, port)
+        self.rtt = rtt
+        self.bytes_up = 0
+        self.bytes_down = 0
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "CountingRelay":
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, "127.0.0.1", 0)
+        )
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        # The loop thread is a daemon; stopping it would strand open streams
+        self.loop.call_soon_threadsafe(self.server.close)
+
+    def reset(self):
+        self.bytes_up = self.bytes_down = self.connections = 0
+
+    async def handle(self, client_reader, client_writer):
+        self.connections += 1
+        await asyncio.sleep(self.rtt)
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.target)
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(
+            self.pipe(client_reader, server_writer, up=True),
+            self.pipe(server_reader, client_writer, up=False),
+        )
+
+    async def pipe(self, reader, writer, up: bool):
+        # Chunks are delayed, not serialised: each is written rtt/2 after it
+        # was read, while later ones are already being read
+        queue = collections.deque()
+        arrived = asyncio.Event()
+        done = False
+
+        async def send():
+            while queue or not done:
+                if not queue:
+                    arrived.clear()
+                    await arrived.wait()
+                    continue
+                due, chunk = queue.popleft()
+                await asyncio.sleep(max(0, due - self.loop.time()))
+                if chunk is None:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+        sender = asyncio.ensure_future(send())
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                if up:
+                    self.bytes_up += len(chunk)
+                else:
+                    self.bytes_down += len(chunk)
+                queue.append((self.loop.time() + self.rtt / 2, chunk))
+                arrived.set()
+        except OSError:
+            pass
+        queue.append((self.loop.time() + self.rtt / 2, None))
+        done = True
+        arrived.set()
+        try:
+            await sender
+        except OSError:
+            pass
+        writer.close()
+
+
+def get_paths(count: int, last_page: int, covers: bool = True) -> list:
+    """The crawler's request mix: a listing, then per film its detail page,
+    a player page per episode, and its cover."""
+    paths = []
+    for index in itertools.count():
+        if index % 30 == 0:
+            paths.append(f"/movie/page/{index // 30 % last_page + 1}/")
+        paths.append(f"/movie/watch-title-{index}-{index}")
+        for ep in range(1, 4):
+            paths.append(f"/watch?id={index}&server=1&ep={ep}")
+        if covers:
+            paths.append(f"/covers/{index}.jpg")
+        if len(paths) >= count:
+            return paths[:count]
+
+
+def run(backend, relay: CountingRelay, paths: list, workers: int) -> dict:
+    headers = {"Accept-Encoding": backend.accept_encoding}
+    relay.reset()
+    failed = 0
+
+    def fetch(path: str) -> bool:
+        response = backend.get(relay.base_url + path, headers=headers, timeout=30)
+        response.content
+        return response.status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(fetch, paths):
+            failed += not ok
+    elapsed = time.perf_counter() - start
+    return {
+        "requests_per_second": len(paths) / elapsed,
+        "bytes_per_request": (relay.bytes_up + relay.bytes_down) / len(paths),
+        "bytes_down": relay.bytes_down,
+        "bytes_up": relay.bytes_up,
+        "connections": relay.connections,
+        "failed": failed,
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="HTTP client backend benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument(
+        "--rtt", type=float, default=0.02, help="Simulated round trip (seconds)"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Origin think time")
+    parser.add_argument("--max-connections", type=int, default=10)
+    parser.add_argument(
+        "--pages-only",
+        action="store_true",
+        help="Leave covers out, to see what brotli does to the HTML alone",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    origin = FakeOrigin(latency=args.latency, compress=True).start()
+    h2_origin = FakeH2Origin(origin).start()
+    relays = {
+        "requests": CountingRelay(*origin.server.server_address[:2], args.rtt),
+        "http2": CountingRelay(
+            *h2_origin.server.sockets[0].getsockname()[:2], args.rtt
+        ),
+    }
+    for relay in relays.values():
+        relay.start()
+
+    paths = get_paths(args.requests, origin.last_page, covers=not args.pages_only)
+    print(
+        f"{len(paths)} requests, rtt {args.rtt * 1000:.0f}ms, "
+        f"brotli {'on' if brotli else 'off (not installed)'}\n"
+    )
+    print(
+        f"{'backend':<10}{'workers':>8}{'req/s':>10}{'B/req':>10}"
+        f"{'KiB down':>10}{'KiB up':>10}{'conns':>8}{'failed':>8}"
+    )
+    for workers in [int(level) for level in args.concurrency.split(",")]:
+        for name in relays:
+            if name == "http2":
+                backend = Http2Backend(
+                    max_connections=args.max_connections, prior_knowledge=True
+                )
+            else:
+                backend = RequestsBackend()
+            res = run(backend, relays[name], paths, workers)
+            backend.close()
+            print(
+                f"{name:<10}{workers:>8}{res['requests_per_second']:>10.1f}"
+                f"{res['bytes_per_request']:>10.0f}{res['bytes_down'] / 1024:>10.0f}"
+                f"{res['bytes_up'] / 1024:>10.0f}{res['connections']:>8}"
+                f"{res['failed']:>8}"
+            )
+
+    for relay in relays.values():
+        relay.stop()
+    h2_origin.stop()
+    origin.stop()
+
+
+if __name__ == "__main__":
+    main()
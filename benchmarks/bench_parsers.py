@@ -0,0 +1,168 @@
+"""Micro-benchmarks for the helper extractors and Crawler page parsing.
+
+Runs offline over benchmarks/corpus/. The pages shipped there are synthetic,
+written by benchmarks/make_corpus.py, and smaller than real ones; saved site
+pages can be dropped in next to them, named by kind: listing_*, detail_*,
+servers_*, episodes_*, player*. Check a parser decision against those before
+relying on these numbers. Reports ops/sec and bytes allocated per call, and
+compares against a saved baseline:
+
+    python -m benchmarks.bench_parsers --save
+    python -m benchmarks.bench_parsers --compare --max-regression 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from base import Crawler
+from helper import helper
+
+BENCH_DIR = Path(__file__).parent
+CORPUS_DIR = BENCH_DIR / "corpus"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+
+def load_corpus() -> dict:
+    corpus = {}
+    for path in sorted(CORPUS_DIR.glob("*.html")):
+        kind = path.stem.split("_")[0]
+        corpus.setdefault(kind, []).append(path.read_text())
+    return corpus
+
+
+class CorpusCrawler(Crawler):
+    """Crawler whose crawl_soup parses corpus pages instead of fetching."""
+
+    def __init__(self, corpus: dict):
+        super().__init__()
+        self.corpus = corpus
+
+    def crawl_soup(self, url, kind: str = ""):
+        if "/watch?" in url:
+            html = self.corpus["player"][0]
+        elif "/episodes" in url:
+            html = self.corpus["episodes"][0]
+        else:
+            html = self.corpus["servers"][0]
+        return BeautifulSoup(html, "html.parser")
+
+
+def get_cases(corpus: dict) -> dict:
+    details = [BeautifulSoup(html, "html.parser") for html in corpus["detail"]]
+    infors = [soup.find("div", class_="detail_page-infor") for soup in details]
+    listings = [BeautifulSoup(html, "html.parser") for html in corpus["listing"]]
+    crawler = CorpusCrawler(corpus)
+
+    def each(items, func):
+        return lambda: [func(item) for item in items]
+
+    return {
+        "parse_listing": each(
+            corpus["listing"], lambda html: BeautifulSoup(html, "html.parser")
+        ),
+        "parse_detail": each(
+            corpus["detail"], lambda html: BeautifulSoup(html, "html.parser")
+        ),
+        "find_flw_items": each(
+            listings, lambda soup: soup.find_all("div", class_="flw-item")
+        ),
+        "get_title": each(infors, lambda infor: helper.get_title("", infor)),
+        "get_description": each(
+            infors, lambda infor: helper.get_description("", infor)
+        ),
+        "get_cover_url": each(infors, lambda infor: helper.get_cover_url("", infor)),
+        "get_trailer_id": each(details, helper.get_trailer_id),
+        "get_servers_link": each(details, helper.get_servers_link),
+        "get_extra_info": each(infors, helper.get_extra_info),
+        "get_episodes_data_tv": lambda: crawler.get_episodes_data("/tv/x"),
+    }
+
+
+def run_case(func, min_time: float) -> dict:
+    func()  # warm up
+
+    ops = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        ops += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": ops / elapsed, "peak_bytes": peak}
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Parser micro-benchmarks")
+    parser.add_argument("--min-time", type=float, default=1.0)
+    parser.add_argument("--filter", default="", help="Only run cases containing this")
+    parser.add_argument("--save", action="store_true", help="Save as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare to baseline")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0,
+        help="Exit 1 if any case is this much slower than baseline, e.g. 0.2",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    corpus = load_corpus()
+    baseline = {}
+    if args.compare:
+        if not BASELINE_FILE.is_file():
+            print(f"No baseline at {BASELINE_FILE}, run with --save first")
+            sys.exit(1)
+        baseline = json.loads(BASELINE_FILE.read_text())
+
+    results = {}
+    regressions = []
+    print(f"{'case':<24}{'ops/sec':>12}{'peak KiB':>12}{'vs base':>10}")
+    for name, func in get_cases(corpus).items():
+        if args.filter not in name:
+            continue
+
+        # Extractors print as they go; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_case(func, args.min_time)
+        results[name] = result
+
+        ratio = ""
+        if name in baseline:
+            change = result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+            ratio = f"{change:+.1%}"
+            if args.max_regression and change < -args.max_regression:
+                regressions.append(name)
+        print(
+            f"{name:<24}{result['ops_per_sec']:>12.1f}"
+            f"{result['peak_bytes'] / 1024:>12.1f}{ratio:>10}"
+        )
+
+    if args.save:
+        BASELINE_FILE.write_text(json.dumps(results, indent=4))
+        print(f"Saved baseline to {BASELINE_FILE}")
+
+    if regressions:
+        print(
+            f"Regressed more than {args.max_regression:.0%}: {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Memory held per crawled film: the old nested dicts versus records.py.
+
+Builds the same films both ways and reports traced bytes per film and the
+pickled size (what crosses the process pool in rebuild_from_archive.py):
+
+    python -m benchmarks.bench_records --films 20000
+"""
+import argparse
+import gc
+import pickle
+import tracemalloc
+
+from records import FilmRecord, MovieRecord
+
+MOVIE_COLS = MovieRecord.__slots__
+
+
+def get_extra_info(n: int) -> dict:
+    return {
+        "Genre": "Action,Drama",
+        "Casts": f"Actor {n},Actor {n + 1}",
+        "Country": "United States",
+        "Duration": "120 min",
+        "imdb": "7.1",
+        "Year": 2020,
+        "quality": "HD",
+    }
+
+
+def make_dicts(n: int) -> tuple:
+    film = {
+        "title": f"Film {n}",
+        "slug": f"film-{n}",
+        "href": f"https://example.com/movie/film-{n}",
+        "description": "x" * 200,
+        "post_type": "movie",
+        "trailer_id": "abcdefghijk",
+        "cover_src": f"https://example.com/covers/{n}.jpg",
+        "servers_link": [f"https://embed.example.com/{n}"],
+        "extra_info": get_extra_info(n),
+        "episodes_data": [],
+    }
+    film["quality"] = film["extra_info"].get("quality", "HD")
+    film["tmdb_id"] = film["extra_info"].get("tmdb_id", "")
+    film["origin_cover_src"] = film["cover_src"]
+    film["post_title"] = film["title"]
+    movie = {col: 0 for col in MOVIE_COLS}
+    movie.update(name=film["title"], slug=film["slug"], type="movie")
+    return film, movie
+
+
+def make_records(n: int) -> tuple:
+    film = FilmRecord(
+        title=f"Film {n}",
+        slug=f"film-{n}",
+        href=f"https://example.com/movie/film-{n}",
+        description="x" * 200,
+        post_type="movie",
+        trailer_id="abcdefghijk",
+        cover_src=f"https://example.com/covers/{n}.jpg",
+        servers_link=[f"https://embed.example.com/{n}"],
+        extra_info=get_extra_info(n),
+    )
+    movie = MovieRecord(name=film.title, slug=film.slug, type="movie")
+    return film, movie
+
+
+def measure(make, films: int) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [make(n) for n in range(films)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(held[0][0], pickle.HIGHEST_PROTOCOL))
+    del held
+    return (after - before) / films, pickled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--films", type=int, default=20000)
+    args = parser.parse_args()
+
+    dict_bytes, dict_pickled = measure(make_dicts, args.films)
+    record_bytes, record_pickled = measure(make_records, args.films)
+    print(f"{'':<10} {'bytes/film':>12} {'pickled':>10}")
+    print(f"{'dicts':<10} {dict_bytes:>12.0f} {dict_pickled:>10}")
+    print(f"{'records':<10} {record_bytes:>12.0f} {record_pickled:>10}")
+    print(f"saving: {1 - record_bytes / dict_bytes:.1%} per film")
+
+
+if __name__ == "__main__":
+    main()
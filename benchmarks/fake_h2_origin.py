@@ -0,0 +1,166 @@
+"""HTTP/2 (h2c, prior knowledge) front for benchmarks.fake_origin.
+
+Serves the same routes, latency and Accept-Encoding handling as a FakeOrigin
+over cleartext HTTP/2, so http_client's http2 backend can be measured
+locally without TLS. Needs the h2 package (pip install "httpx[http2]"):
+
+    python -m benchmarks.fake_h2_origin --port 8766 --latency 0.05 --compress
+
+Links in the pages point at the wrapped HTTP/1.1 origin.
+"""
+import argparse
+import asyncio
+import random
+import threading
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+from benchmarks.fake_origin import FakeOrigin
+
+
+class H2Protocol(asyncio.Protocol):
+    def __init__(self, origin: FakeOrigin):
+        self.origin = origin
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.transport = None
+        self.window_updated = asyncio.Event()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.flush()
+
+    def flush(self):
+        data = self.conn.data_to_send()
+        if data and not self.transport.is_closing():
+            self.transport.write(data)
+
+    def data_received(self, data: bytes):
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.flush()
+            self.transport.close()
+            return
+
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self.respond(event.stream_id, event.headers))
+            elif isinstance(
+                event, (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged)
+            ):
+                # Wake every sender waiting for window, then re-arm
+                self.window_updated.set()
+                self.window_updated = asyncio.Event()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.flush()
+
+    def connection_lost(self, exc):
+        self.window_updated.set()
+
+    async def respond(self, stream_id: int, headers: list):
+        headers = dict(headers)
+        origin = self.origin
+        delay = origin.latency + random.uniform(0, origin.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if random.random() < origin.error_rate:
+            status, content_type, body = 503, "text/html", "Overloaded"
+        else:
+            status, content_type, body = origin.route(headers.get(":path", "/"))
+
+        if isinstance(body, str):
+            body = body.encode()
+        encoding, body = origin.encode(
+            content_type, body, headers.get("accept-encoding", "")
+        )
+        response_headers = [
+            (":status", str(status)),
+            ("content-type", content_type),
+            ("content-length", str(len(body))),
+        ]
+        if encoding:
+            response_headers.append(("content-encoding", encoding))
+
+        try:
+            self.conn.send_headers(stream_id, response_headers)
+            await self.send_body(stream_id, body)
+        except h2.exceptions.StreamClosedError:
+            return
+        with origin.lock:
+            origin.requests += 1
+            origin.bytes_sent += len(body)
+
+    async def send_body(self, stream_id: int, body: bytes):
+        while True:
+            while self.conn.local_flow_control_window(stream_id) < 1:
+                if self.transport.is_closing():
+                    return
+                await self.window_updated.wait()
+
+            size = min(
+                self.conn.local_flow_control_window(stream_id),
+                self.conn.max_outbound_frame_size,
+                len(body),
+            )
+            self.conn.send_data(stream_id, body[:size], end_stream=size == len(body))
+            self.flush()
+            body = body[size:]
+            if not body:
+                return
+
+
+class FakeH2Origin:
+    def __init__(self, origin: FakeOrigin, host: str = "127.0.0.1", port: int = 0):
+        self.origin = origin
+        self.host = host
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeH2Origin":
+        self.server = self.loop.run_until_complete(
+            self.loop.create_server(
+                lambda: H2Protocol(self.origin), self.host, self.port
+            )
+        )
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        # The loop thread is a daemon; stopping it would strand open streams
+        self.loop.call_soon_threadsafe(self.server.close)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Fake fmovies origin over h2c")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--compress", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    origin = FakeOrigin(latency=args.latency, compress=args.compress)
+    h2_origin = FakeH2Origin(origin, host=args.host, port=args.port)
+    h2_origin.start()
+    print(f"Serving fake h2c origin on {h2_origin.base_url}")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Local stand-in for the fmovies origin and its image CDN.
+
+Serves listing, detail, server, episode and player pages from
+benchmarks.pages, cover images and a gzipped sitemap index, with
+configurable latency and error rate:
+
+    python -m benchmarks.fake_origin --port 8765 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import gzip
+import io
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import pages
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_cover() -> bytes:
+    try:
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 450), (120, 80, 40)).save(buffer, format="JPEG")
+        return buffer.getvalue()
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + bytes(30 * 1024) + b"\xff\xd9"
+
+
+class FakeOrigin:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        last_page: int = 50,
+        per_page: int = 30,
+        episode_count: int = 12,
+        sitemap_size: int = 500,
+        compress: bool = False,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.last_page = last_page
+        self.per_page = per_page
+        self.episode_count = episode_count
+        self.sitemap_size = sitemap_size
+        # Honour Accept-Encoding on pages (br when brotli is installed), as
+        # the real origin does
+        self.compress = compress
+        self.cover = make_cover()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.get_handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOrigin":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def route(self, path: str) -> tuple:
+        """Returns (status, content type, body)."""
+        html = "text/html; charset=utf-8"
+        base = self.base_url
+
+        match = re.match(r"^/(movie|tv-show)/page/(\d+)/?$", path)
+        if match or path.rstrip("/") in ("/movie", "/tv-show"):
+            post_type = "tvshows" if "tv-show" in path else "movie"
+            page = int(match.group(2)) if match else 1
+            if page > self.last_page:
+                return 200, html, pages.render_listing(page, post_type, per_page=0)
+            return 200, html, pages.render_listing(page, post_type, self.per_page)
+
+        film_count = self.last_page * self.per_page
+        sitemap_parts = -(-film_count // self.sitemap_size)
+        if path == "/sitemap.xml":
+            return (
+                200,
+                "application/xml",
+                pages.render_sitemap_index(
+                    base, {"movie": sitemap_parts, "tv": sitemap_parts}
+                ),
+            )
+
+        match = re.match(r"^/sitemap-(movie|tv)-(\d+)\.xml\.gz$", path)
+        if match:
+            post_type = "tvshows" if match.group(1) == "tv" else "movie"
+            start = (int(match.group(2)) - 1) * self.sitemap_size
+            count = max(0, min(self.sitemap_size, film_count - start))
+            body = pages.render_sitemap(base, post_type, start, count)
+            return 200, "application/x-gzip", gzip.compress(body.encode())
+
+        match = re.match(r"^/covers/(\d+)\.jpg$", path)
+        if match:
+            return 200, "image/jpeg", self.cover
+
+        match = re.match(r"^/watch\?id=(\d+)&server=(\d+)&ep=(\d+)", path)
+        if match:
+            index, server, ep = map(int, match.groups())
+            return 200, html, pages.render_player(index, server, ep)
+
+        match = re.match(r"^/tv/watch-title-(\d+)-\d+/episodes\?.*server=(\d+)", path)
+        if match:
+            index, server = map(int, match.groups())
+            return (
+                200,
+                html,
+                pages.render_episodes(index, server, base, self.episode_count),
+            )
+
+        match = re.match(r"^/(movie|tv)/watch-title-(\d+)-\d+/?$", path)
+        if match:
+            post_type = "tvshows" if match.group(1) == "tv" else "movie"
+            index = int(match.group(2))
+            return 200, html, pages.render_detail(index, post_type, cover_base=base)
+
+        match = re.match(r"^/tv/watch-title-(\d+)-\d+/servers/?$", path)
+        if match:
+            return 200, html, pages.render_servers(int(match.group(1)), base)
+
+        return 404, html, "<html><body>Not found</body></html>"
+
+    def encode(self, content_type: str, body: bytes, accept_encoding: str) -> tuple:
+        """Returns (Content-Encoding or "", body)."""
+        if not self.compress or not content_type.startswith(
+            ("text/", "application/xml")
+        ):
+            return "", body
+        encodings = [e.split(";")[0].strip() for e in accept_encoding.split(",")]
+        if "br" in encodings and brotli:
+            return "br", brotli.compress(body, quality=5)
+        if "gzip" in encodings:
+            return "gzip", gzip.compress(body, compresslevel=6)
+        return "", body
+
+    def get_handler(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                delay = origin.latency + random.uniform(0, origin.jitter)
+                if delay:
+                    time.sleep(delay)
+
+                if random.random() < origin.error_rate:
+                    status, content_type, body = 503, "text/html", "Overloaded"
+                else:
+                    status, content_type, body = origin.route(self.path)
+
+                if isinstance(body, str):
+                    body = body.encode()
+                encoding, body = origin.encode(
+                    content_type, body, self.headers.get("Accept-Encoding", "")
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+                with origin.lock:
+                    origin.requests += 1
+                    origin.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Fake fmovies origin")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--last-page", type=int, default=50)
+    parser.add_argument(
+        "--compress", action="store_true", help="Honour Accept-Encoding (gzip, br)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    origin = FakeOrigin(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        last_page=args.last_page,
+        compress=args.compress,
+    )
+    print(f"Serving fake origin on {origin.base_url}")
+    origin.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
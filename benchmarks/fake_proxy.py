@@ -0,0 +1,158 @@
+"""Local stand-in HTTP proxies for exercising proxy_pool.
+
+A FakeProxy forwards plain-HTTP GETs (absolute-URI requests, which is what
+requests sends to an http:// proxy) and can be made slow or made to answer
+403 like a banned address. Running the module starts a fake origin and a few
+proxies with different behaviour, pushes requests through ProxyPool and
+prints per-proxy success rate, latency and throughput:
+
+    python -m benchmarks.fake_proxy --requests 500 --workers 8
+"""
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeProxy:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        block_rate: float = 0.0,
+        block_after: int = 0,
+    ):
+        self.latency = latency
+        self.block_rate = block_rate
+        # Start answering 403 to everything after this many requests (0: never)
+        self.block_after = block_after
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        self.server = ThreadingHTTPServer((host, port), self.get_handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeProxy":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def is_blocked(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            requests = self.requests
+        if self.block_after and requests > self.block_after:
+            return True
+        return random.random() < self.block_rate
+
+    def forward(self, url: str, headers: dict) -> tuple:
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                return (
+                    response.status,
+                    response.headers.get_content_type(),
+                    (response.read()),
+                )
+        except urllib.error.HTTPError as e:
+            return e.code, "text/html", e.read()
+
+    def get_handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if proxy.latency:
+                    time.sleep(proxy.latency)
+
+                if proxy.is_blocked():
+                    status, content_type, body = 403, "text/html", b"Blocked"
+                else:
+                    headers = {
+                        key: value
+                        for key, value in self.headers.items()
+                        if key.lower() not in ("host", "proxy-connection")
+                    }
+                    status, content_type, body = proxy.forward(self.path, headers)
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="ProxyPool against fake proxies")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--cooldown", type=float, default=2)
+    return parser.parse_args()
+
+
+def main():
+    from benchmarks.fake_origin import FakeOrigin
+    from proxy_pool import ProxyPool
+
+    args = get_args()
+    origin = FakeOrigin(latency=0.01).start()
+    proxies = {
+        "healthy": FakeProxy().start(),
+        "slow": FakeProxy(latency=0.3).start(),
+        "flaky": FakeProxy(block_rate=0.3).start(),
+        "banned": FakeProxy(block_after=20).start(),
+    }
+    for name, proxy in proxies.items():
+        print(f"{name:<8} {proxy.url}")
+
+    pool = ProxyPool(
+        [proxy.url for proxy in proxies.values()],
+        slow_seconds=0.2,
+        cooldown=args.cooldown,
+    )
+    urls = [
+        f"{origin.base_url}/movie/watch-title-{i}-{10000 + i}"
+        for i in range(args.requests)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        statuses = list(executor.map(lambda url: pool.get(url).status_code, urls))
+    elapsed = time.perf_counter() - start
+
+    ok = sum(status == 200 for status in statuses)
+    print(f"\n{ok}/{len(statuses)} ok in {elapsed:.1f}s\n")
+    print(f"{'proxy':<22} {'requests':>8} {'ok':>6} {'latency':>8} {'req/s':>7}")
+    for row in pool.report():
+        print(
+            f"{row['proxy']:<22} {row['requests']:>8} {row['success_rate']:>6.0%} "
+            f"{row['latency']:>8.3f} {row['requests_per_second']:>7.1f}"
+            + (" cooling down" if row["cooling_down"] else "")
+        )
+
+    origin.stop()
+    for proxy in proxies.values():
+        proxy.stop()
+
+
+if __name__ == "__main__":
+    main()
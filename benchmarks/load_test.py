@@ -0,0 +1,187 @@
+"""End-to-end load test: the real crawl path against benchmarks.fake_origin and
+the SQLite Database stand-in, at several worker counts.
+
+    python -m benchmarks.load_test --flow movies --pages 3 --concurrency 1,4,16 \
+        --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_origin import FakeOrigin
+from settings import CONFIG
+
+
+def configure(base_url: str, workdir: str):
+    # Must run before the crawler modules are imported: _db picks its backend
+    # and cover storage its root at import time.
+    CONFIG.DB_BACKEND = "sqlite"
+    CONFIG.SQLITE_PATH = ":memory:"
+    CONFIG.FMOVIERS_HOMEPAGE = base_url
+    CONFIG.FMOVIERS_MOVIES_PAGE = f"{base_url}/movie"
+    CONFIG.FMOVIERS_TVSHOWS_PAGE = f"{base_url}/tv-show"
+    CONFIG.COVER_SAVE_PATH = workdir
+    CONFIG.DOMAIN_NAME = "http://localhost"
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def get_listing_urls(flow: str, pages: int) -> list:
+    if flow == "update":
+        return [
+            (f"{CONFIG.FMOVIERS_TVSHOWS_PAGE}/", CONFIG.TYPE_TV_SHOWS),
+            (f"{CONFIG.FMOVIERS_MOVIES_PAGE}/", CONFIG.TYPE_MOVIE),
+        ]
+
+    if flow == "tvseries":
+        page_url, post_type = CONFIG.FMOVIERS_TVSHOWS_PAGE, CONFIG.TYPE_TV_SHOWS
+    else:
+        page_url, post_type = CONFIG.FMOVIERS_MOVIES_PAGE, CONFIG.TYPE_MOVIE
+    return [(f"{page_url}/page/{i}/", post_type) for i in range(2, 2 + pages)]
+
+
+def run_level(crawler, origin, database, cover_pool, listing_urls, workers) -> dict:
+    database.truncate(list(CONFIG.INSERT.keys()))
+    shutil.rmtree(f"{CONFIG.COVER_SAVE_PATH}/covers", ignore_errors=True)
+    database.reset_stats()
+    origin_requests, origin_bytes = origin.requests, origin.bytes_sent
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    latencies = []
+
+    def crawl(flw_item, post_type):
+        start = time.perf_counter()
+        with database.measure(flw_item.find("a").get("href")):
+            crawler.crawl_ml_item(flw_item=flw_item, post_type=post_type)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url, post_type in listing_urls:
+            soup = crawler.crawl_soup(url)
+            flw_items = soup.find_all("div", class_="flw-item")
+            list(executor.map(lambda item: crawl(item, post_type), flw_items))
+    cover_pool.wait()
+    elapsed = time.perf_counter() - start
+
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    films = len(latencies)
+    film_round_trips = [stats["round_trips"] for stats in database.film_stats.values()]
+    return {
+        "workers": workers,
+        "films": films,
+        "films_per_sec": films / elapsed if elapsed else 0,
+        "p50": statistics.median(latencies) if latencies else 0,
+        "p99": percentile(latencies, 0.99),
+        "requests": origin.requests - origin_requests,
+        "mib": (origin.bytes_sent - origin_bytes) / 1024 / 1024,
+        "cpu": (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime),
+        "db_per_film": statistics.mean(film_round_trips) if film_round_trips else 0,
+        "db_max_film": max(film_round_trips, default=0),
+        "stmts_per_film": statistics.mean(
+            stats["statements"] for stats in database.film_stats.values()
+        )
+        if film_round_trips
+        else 0,
+        # Round trips no insert_film accounted for, e.g. from a stray thread
+        "db_unattributed": database.stats["round_trips"] - sum(film_round_trips),
+        "maxrss_mib": after.ru_maxrss / 1024,
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Crawl load test")
+    parser.add_argument(
+        "--flow", choices=["movies", "tvseries", "update"], default="movies"
+    )
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--max-db-per-film",
+        type=int,
+        default=0,
+        help="Fail if any film takes more DB round trips than this",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    origin = FakeOrigin(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        last_page=args.pages + 1,
+    ).start()
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    configure(origin.base_url, workdir)
+
+    from _db import database
+    from base import Crawler
+    from cover_pool import cover_pool
+
+    crawler = Crawler()
+    listing_urls = get_listing_urls(args.flow, args.pages)
+
+    columns = [
+        "workers",
+        "films",
+        "films_per_sec",
+        "p50",
+        "p99",
+        "requests",
+        "mib",
+        "cpu",
+        "stmts_per_film",
+        "db_per_film",
+        "db_max_film",
+        "maxrss_mib",
+    ]
+    failures = []
+    print("".join(f"{column:>14}" for column in columns))
+    try:
+        for workers in [int(x) for x in args.concurrency.split(",")]:
+            result = run_level(
+                crawler, origin, database, cover_pool, listing_urls, workers
+            )
+            print(
+                "".join(
+                    f"{result[column]:>14.3f}"
+                    if isinstance(result[column], float)
+                    else f"{result[column]:>14}"
+                    for column in columns
+                )
+            )
+            if result["db_unattributed"]:
+                failures.append(
+                    f"{workers} workers: {result['db_unattributed']} round trips "
+                    "outside any film"
+                )
+            if args.max_db_per_film and result["db_max_film"] > args.max_db_per_film:
+                failures.append(
+                    f"{workers} workers: a film took {result['db_max_film']} round "
+                    f"trips, over {args.max_db_per_film}"
+                )
+    finally:
+        origin.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Regenerates benchmarks/corpus/ from benchmarks.pages.
+
+    python -m benchmarks.make_corpus
+"""
+from pathlib import Path
+
+from benchmarks import pages
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+def main():
+    CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+    files = {
+        "listing_movie.html": pages.render_listing(2, post_type="movie"),
+        "listing_tv.html": pages.render_listing(2, post_type="tvshows"),
+        "servers_tv.html": pages.render_servers(7),
+        "episodes_tv.html": pages.render_episodes(7, episode_count=24),
+        "player.html": pages.render_player(7),
+    }
+    for i in range(3):
+        files[f"detail_movie_{i}.html"] = pages.render_detail(i, post_type="movie")
+        files[f"detail_tv_{i}.html"] = pages.render_detail(100 + i, post_type="tvshows")
+
+    for name, html in files.items():
+        (CORPUS_DIR / name).write_text(html)
+        print(f"Wrote {name}")
+
+
+if __name__ == "__main__":
+    main()
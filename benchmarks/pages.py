@@ -0,0 +1,161 @@
+"""Synthetic pages in the fmovies markup that base.Crawler and helper parse."""
+import random
+
+GENRES = ["Action", "Drama", "Comedy", "Thriller", "Animation", "Sci-Fi"]
+COUNTRIES = ["United States", "United Kingdom", "Japan", "Korea", "France"]
+CASTS = ["Anna Lee", "John Park", "Maria Silva", "Ken Ito", "Paul Roy", "Eva Moss"]
+SERVERS = ["vidcloud.co", "upcloud.to", "mixdrop.co", "streamtape.com"]
+FILLER = "<p class='filler'>" + "Lorem ipsum dolor sit amet. " * 20 + "</p>"
+
+
+def get_slug(post_type: str, index: int) -> str:
+    kind = "tv" if post_type == "tvshows" else "movie"
+    return f"{kind}/watch-title-{index}-{10000 + index}"
+
+
+def render_listing(page: int, post_type: str = "movie", per_page: int = 30) -> str:
+    items = []
+    for i in range(per_page):
+        index = (page - 1) * per_page + i
+        slug = get_slug(post_type, index)
+        items.append(
+            f"""
+<div class="flw-item">
+  <div class="film-poster">
+    <img data-src="/covers/{index}.jpg" class="film-poster-img">
+    <a href="/{slug}" class="film-poster-ahref" title="Title {index}"></a>
+  </div>
+  <div class="film-detail">
+    <h3 class="film-name"><a href="/{slug}" title="Title {index}">Title {index}</a></h3>
+    <div class="fd-infor"><span class="fdi-item">{2000 + index % 24}</span></div>
+  </div>
+</div>"""
+        )
+    return f"""<!DOCTYPE html><html><head><title>Page {page}</title></head><body>
+<div id="header">{FILLER}</div>
+<div class="film_list-wrap">{''.join(items)}</div>
+<div id="footer">{FILLER * 3}</div>
+</body></html>"""
+
+
+def render_detail(
+    index: int,
+    post_type: str = "movie",
+    cover_base: str = "https://img.example.com",
+    server_count: int = 4,
+) -> str:
+    rnd = random.Random(index)
+    genres = ", ".join(rnd.sample(GENRES, 2))
+    casts = ", ".join(rnd.sample(CASTS, 3))
+    country = rnd.choice(COUNTRIES)
+    scripts = "".join(
+        f'$(".server{i + 1}").attr("data-src", "https://{SERVERS[i % len(SERVERS)]}/e/{index}x{i}/");\n'
+        for i in range(server_count)
+    )
+    return f"""<!DOCTYPE html><html><head><title>Title {index}</title></head><body>
+<div id="header">{FILLER}</div>
+<div class="watching_player-area">
+  <iframe id="iframe-trailer" data-src="https://www.youtube.com/embed/tr{index}"></iframe>
+</div>
+<div class="detail_page-infor">
+  <div class="dp-i-content">
+    <div class="dp-i-c-poster">
+      <div class="film-poster"><img src="{cover_base}/covers/{index}.jpg" class="film-poster-img"></div>
+    </div>
+    <div class="dp-i-c-right">
+      <h2 class="heading-name"><a href="/{get_slug(post_type, index)}">Title {index}</a></h2>
+      <div class="dp-i-stats">
+        <span class="item mr-1"><span class="quality">HD</span></span>
+        <span class="item mr-2"><span class="imdb">IMDB: <span itemprop="ratingValue">{rnd.randint(10, 95) / 10}<a href="https://www.themoviedb.org/movie/{50000 + index}/"></a></span></span></span>
+        <button class="btn btn-sm btn-imdb">IMDB: 7.1</button>
+      </div>
+      <div class="description">
+        Synthetic description for title {index}. {"Some words about the plot. " * 10}
+      </div>
+      <div class="elements">
+        <div class="row">
+          <div class="col-xl-5 col-lg-6 col-md-8 col-sm-12">
+            <div class="row-line"><span class="type"><strong>Released: </strong></span> {2000 + index % 24}-01-01</div>
+            <div class="row-line"><span class="type"><strong>Genre: </strong></span> {genres}</div>
+            <div class="row-line"><span class="type"><strong>Casts: </strong></span> {casts}</div>
+          </div>
+          <div class="col-xl-6 col-lg-6 col-md-4 col-sm-12">
+            <div class="row-line"><span class="type"><strong>Duration: </strong></span> {rnd.randint(20, 150)} min</div>
+            <div class="row-line"><span class="type"><strong>Country: </strong></span> {country}</div>
+            <div class="row-line"><span class="type"><strong>Production: </strong></span> Studio {index % 7}</div>
+          </div>
+        </div>
+      </div>
+    </div>
+  </div>
+</div>
+<div id="footer">{FILLER * 3}</div>
+<script>
+{scripts}</script>
+</body></html>"""
+
+
+def render_servers(index: int, base: str = "", server_count: int = 3) -> str:
+    lis = "".join(
+        f'<li class="nav-item"><a data-id="{i}" class="nav-link btn btn-sm btn-secondary" '
+        f'href="{base}/tv/watch-title-{index}-{10000 + index}/episodes?id={index}&server={i + 1}&ep=1">'
+        f"Server {SERVERS[i % len(SERVERS)].split('.')[0].upper()}</a></li>"
+        for i in range(server_count)
+    )
+    return f"""<!DOCTYPE html><html><body>
+<div id="header">{FILLER}</div>
+<ul class="nav" id="servers-list">{lis}</ul>
+<div id="footer">{FILLER}</div>
+</body></html>"""
+
+
+def render_episodes(
+    index: int, server: int = 1, base: str = "", episode_count: int = 12
+) -> str:
+    lis = "".join(
+        f'<li class="episode-item"><a data-id="{server}" '
+        f'href="{base}/watch?id={index}&server={server}&ep={ep}">{ep} - Episode {ep}</a></li>'
+        for ep in range(1, episode_count + 1)
+    )
+    return f"""<!DOCTYPE html><html><body>
+<div id="header">{FILLER}</div>
+<ul class="list-episodes">{lis}</ul>
+<div id="footer">{FILLER * 2}</div>
+</body></html>"""
+
+
+def render_player(index: int, server: int = 1, ep: int = 1) -> str:
+    return f"""<!DOCTYPE html><html><body>
+<div id="header">{FILLER}</div>
+<div id="playerMovie"><iframe src="//{SERVERS[server % len(SERVERS)]}/e/{index}-{ep}" allowfullscreen></iframe></div>
+<div id="footer">{FILLER * 3}</div>
+</body></html>"""
+
+
+def render_sitemap_index(base: str, parts: dict) -> str:
+    """parts: {"movie": n, "tv": n} gzip sitemap files per kind."""
+    sitemaps = "".join(
+        f"<sitemap><loc>{base}/sitemap-{kind}-{part}.xml.gz</loc>"
+        f"<lastmod>2024-01-{part % 28 + 1:02d}</lastmod></sitemap>"
+        for kind, count in parts.items()
+        for part in range(1, count + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{sitemaps}</sitemapindex>"
+    )
+
+
+def render_sitemap(base: str, post_type: str, start: int, count: int) -> str:
+    urls = "".join(
+        f"<url><loc>{base}/{get_slug(post_type, index)}</loc>"
+        f"<lastmod>2024-01-{index % 28 + 1:02d}T00:00:00+00:00</lastmod>"
+        f"<changefreq>weekly</changefreq></url>"
+        for index in range(start, start + count)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{urls}</urlset>"
+    )
@@ -0,0 +1,82 @@
+"""Soak test: crawl thousands of films from benchmarks.fake_origin in one
+process and sample RSS as it goes, to check that memory stays flat:
+
+    python -m benchmarks.soak_test --films 5000 --sample-every 250
+    python -m benchmarks.soak_test --films 5000 --no-teardown   # for comparison
+
+Prints RSS per sample and the growth in MiB per 1000 films over the second
+half of the run (the first half includes caches and allocator warm-up).
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.fake_origin import FakeOrigin
+from benchmarks.load_test import configure
+from settings import CONFIG
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Crawl memory soak test")
+    parser.add_argument("--films", type=int, default=5000)
+    parser.add_argument("--sample-every", type=int, default=250)
+    parser.add_argument("--per-page", type=int, default=30)
+    parser.add_argument(
+        "--no-teardown",
+        action="store_true",
+        help="Skip Crawler.release to see what the tree teardown saves",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    pages = -(-args.films // args.per_page)
+    origin = FakeOrigin(last_page=pages + 1, per_page=args.per_page).start()
+    workdir = tempfile.mkdtemp(prefix="soak_test_")
+    configure(origin.base_url, workdir)
+    # A file, so the growing film tables do not count as process memory
+    CONFIG.SQLITE_PATH = f"{workdir}/soak.sqlite"
+    CONFIG.MEMORY_LOG_INTERVAL = 0
+
+    from base import Crawler
+    from cover_pool import cover_pool
+    from memory_guard import memory_guard
+
+    crawler = Crawler()
+    if args.no_teardown:
+        crawler.release = lambda tag: None
+
+    samples = []
+    films = 0
+    start = time.perf_counter()
+    print(f"{'films':>8} {'rss_mib':>10} {'films/s':>8}")
+    for page in range(1, pages + 1):
+        flw_items = crawler.get_flw_items(f"{CONFIG.FMOVIERS_MOVIES_PAGE}/page/{page}/")
+        for flw_item in flw_items:
+            crawler.crawl_ml_item(flw_item=flw_item, post_type=CONFIG.TYPE_MOVIE)
+            films += 1
+            if films % args.sample_every == 0:
+                cover_pool.wait()
+                rss = memory_guard.get_rss() / 1024 / 1024
+                samples.append((films, rss))
+                rate = films / (time.perf_counter() - start)
+                print(f"{films:>8} {rss:>10.1f} {rate:>8.1f}")
+            if films >= args.films:
+                break
+        if flw_items:
+            crawler.release(flw_items[0])
+        if films >= args.films:
+            break
+
+    origin.stop()
+    second_half = samples[len(samples) // 2 :]
+    if len(second_half) >= 2:
+        first_films, first_rss = second_half[0]
+        last_films, last_rss = second_half[-1]
+        slope = (last_rss - first_rss) / (last_films - first_films) * 1000
+        print(f"\ngrowth over the second half: {slope:+.2f} MiB per 1000 films")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+from metrics import metrics
+from settings import CONFIG
+
+
+class AIMDController:
+    """Additive-increase/multiplicative-decrease limit on films in flight.
+
+    Latency samples are grouped by signal ("fetch", "db") into windows of
+    `window` seconds. At the end of a window the limit drops to
+    limit * decrease if there was an error or a signal's p90 exceeded its
+    target. Otherwise it grows by `increase`, but only if the limit was
+    actually reached during the window.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 64,
+        increase: int = 1,
+        decrease: float = 0.5,
+        targets: dict = None,
+        window: float = 5,
+    ):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.targets = targets or {
+            "fetch": getattr(CONFIG, "CONCURRENCY_FETCH_TARGET", 2.0),
+            "db": getattr(CONFIG, "CONCURRENCY_DB_TARGET", 0.2),
+        }
+        self.window = window
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.reset_window()
+        metrics.set("concurrency_limit", self.limit)
+
+    def reset_window(self):
+        self.window_start = time.monotonic()
+        self.samples = {signal: [] for signal in self.targets}
+        self.errors = 0
+        self.saturated = False
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.saturated = True
+                self.cond.wait()
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self.saturated = True
+            metrics.set("concurrency_in_flight", self.in_flight)
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            metrics.set("concurrency_in_flight", self.in_flight)
+            self.cond.notify()
+
+    def observe(self, signal: str, seconds: float):
+        with self.cond:
+            self.samples.setdefault(signal, []).append(seconds)
+            self.maybe_adjust()
+
+    def error(self, signal: str = ""):
+        with self.cond:
+            self.errors += 1
+            self.maybe_adjust()
+
+    def get_p90(self, samples: list) -> float:
+        if not samples:
+            return 0
+        samples = sorted(samples)
+        return samples[int(len(samples) * 0.9) if len(samples) > 1 else 0]
+
+    def maybe_adjust(self):
+        if time.monotonic() - self.window_start < self.window:
+            return
+
+        over = [
+            signal
+            for signal, target in self.targets.items()
+            if self.get_p90(self.samples.get(signal, [])) > target
+        ]
+        limit = self.limit
+        if self.errors or over:
+            limit = max(self.minimum, int(self.limit * self.decrease))
+            reason = f"{self.errors} errors" if self.errors else f"{over} over target"
+        elif self.saturated:
+            limit = min(self.maximum, self.limit + self.increase)
+            reason = "latency within targets"
+
+        if limit != self.limit:
+            direction = "up" if limit > self.limit else "down"
+            logging.info(f"[concurrency] {self.limit} -> {limit} ({reason})")
+            metrics.inc("concurrency_adjustments_total", direction=direction)
+            metrics.set("concurrency_limit", limit)
+            self.limit = limit
+            self.cond.notify_all()
+        self.reset_window()
+
+    def on_fetch_total(self, value: float, labels: dict):
+        # Label values arrive as strings: "error", "429", "503", ...
+        status = labels.get("status", "")
+        if status in ("error", "429") or (len(status) == 3 and status[0] == "5"):
+            self.error("fetch")
+
+    def attach(self):
+        """Feeds the controller from the crawler's fetch and Database metrics."""
+        metrics.subscribe(
+            "fetch_seconds", lambda value, labels: self.observe("fetch", value)
+        )
+        metrics.subscribe(
+            "db_query_seconds", lambda value, labels: self.observe("db", value)
+        )
+        metrics.subscribe("fetch_total", self.on_fetch_total)
+        metrics.subscribe("db_errors_total", lambda value, labels: self.error("db"))
+        return self
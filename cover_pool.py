@@ -0,0 +1,130 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from cover_store import cover_store
+from helper import helper
+from memory_guard import memory_guard
+from metrics import metrics
+from proxy_pool import proxy_pool
+from settings import CONFIG
+
+
+class CoverPool:
+    """Bounded background pool for cover downloads.
+
+    Covers are streamed into a temp file next to the target and renamed into
+    place, so a half-written image is never served. Requests for a slug that is
+    already in flight share the same future.
+    """
+
+    def __init__(
+        self, max_workers: int = 4, max_pending: int = 64, use_store: bool = False
+    ):
+        self.use_store = use_store
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cover"
+        )
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get_save_path(self, image_name: str) -> Path:
+        return Path(CONFIG.COVER_SAVE_PATH) / "covers" / image_name
+
+    def get_saved_path(self, image_name: str) -> Path:
+        if self.use_store:
+            return cover_store.get_path(image_name)
+        return self.get_save_path(image_name)
+
+    def is_saved(self, image_name: str) -> bool:
+        saved_path = self.get_saved_path(image_name)
+        return bool(saved_path) and saved_path.is_file()
+
+    def submit(
+        self,
+        image_url: str,
+        image_name: str,
+        headers: dict = None,
+        force: bool = False,
+    ) -> Future:
+        if not force and self.is_saved(image_name):
+            metrics.inc("cover_cache_total", result="hit")
+            future = Future()
+            future.set_result(str(self.get_saved_path(image_name)))
+            return future
+
+        with self.lock:
+            if image_name in self.in_flight:
+                metrics.inc("cover_cache_total", result="in_flight")
+                return self.in_flight[image_name]
+
+        metrics.inc("cover_cache_total", result="miss")
+        # Blocks the producer once max_pending downloads are queued
+        self.pending.acquire()
+        with self.lock:
+            if image_name in self.in_flight:
+                self.pending.release()
+                return self.in_flight[image_name]
+
+            future = self.executor.submit(
+                self.download, image_url, self.get_save_path(image_name), headers or {}
+            )
+            self.in_flight[image_name] = future
+
+        future.add_done_callback(lambda _: self.done(image_name))
+        return future
+
+    def done(self, image_name: str):
+        with self.lock:
+            self.in_flight.pop(image_name, None)
+        self.pending.release()
+
+    # Timed here, in the worker: save_thumb only queues the download
+    @metrics.timed("save_thumb_seconds")
+    def download(self, image_url: str, save_path: Path, headers: dict) -> str:
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=save_path.parent, prefix=f".{save_path.name}.", suffix=".part"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f, proxy_pool.get(
+                image_url, headers=headers, stream=True, timeout=30
+            ) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    metrics.inc("cover_bytes_total", len(chunk))
+            os.chmod(tmp_path, 0o644)
+            if self.use_store:
+                save_path = cover_store.put(tmp_path, save_path.name)
+            else:
+                os.replace(tmp_path, save_path)
+            logging.info(f"[+] Saved cover {save_path.name}")
+            return str(save_path)
+        except Exception as e:
+            Path(tmp_path).unlink(missing_ok=True)
+            helper.error_log(
+                f"Failed to download cover {image_url}\n{e}",
+                log_file="cover_pool.download.log",
+            )
+            return ""
+
+    def wait(self):
+        with self.lock:
+            futures = list(self.in_flight.values())
+        for future in futures:
+            future.result()
+        if self.use_store:
+            cover_store.save_nginx_map()
+
+
+cover_pool = CoverPool(
+    max_workers=getattr(CONFIG, "COVER_WORKERS", 4),
+    max_pending=getattr(CONFIG, "COVER_MAX_PENDING", 64),
+    use_store=getattr(CONFIG, "COVER_STORAGE", "flat") == "cas",
+)
+memory_guard.add_cleanup(cover_pool.wait)
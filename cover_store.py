@@ -0,0 +1,134 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from settings import CONFIG
+
+
+class CoverStore:
+    """Content-addressed cover storage.
+
+    Files live under covers/objects/<aa>/<bb>/<sha256>.<ext>, so identical
+    posters are stored once and no directory grows past a few hundred entries.
+    The public name ("{slug}.{ext}") is mapped to its object through a SQLite
+    index. Nothing is written to covers/ itself; DOMAIN_NAME/covers/{slug}.{ext}
+    URLs are served through the nginx map of that index, which is rewritten
+    at most every `map_interval` seconds while new names come in, and at exit.
+    """
+
+    def __init__(self, root: str, nginx_map: str = "", map_interval: float = 60):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.nginx_map = nginx_map
+        self.map_interval = map_interval
+        self.map_dirty = False
+        self.map_saved_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.map_lock = threading.Lock()
+        self.conn = None
+        if nginx_map:
+            atexit.register(self.save_nginx_map)
+
+    def get_conn(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(
+                self.root / "index.sqlite", check_same_thread=False
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS covers "
+                "(name TEXT PRIMARY KEY, object TEXT NOT NULL)"
+            )
+        return self.conn
+
+    def get_digest(self, path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get_object_name(self, digest: str, extension: str) -> str:
+        return f"objects/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def lookup(self, name: str) -> str:
+        with self.lock:
+            row = (
+                self.get_conn()
+                .execute("SELECT object FROM covers WHERE name=?", (name,))
+                .fetchone()
+            )
+        return row[0] if row else ""
+
+    def get_path(self, name: str) -> Path:
+        object_name = self.lookup(name)
+        if not object_name:
+            return None
+        return self.root / object_name
+
+    def exists(self, name: str) -> bool:
+        path = self.get_path(name)
+        return bool(path) and path.is_file()
+
+    def put(self, src: Path, name: str) -> Path:
+        """Move src into the store under its content hash and index it as name."""
+        src = Path(src)
+        object_name = self.get_object_name(self.get_digest(src), Path(name).suffix)
+        object_path = self.root / object_name
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        if object_path.is_file():
+            src.unlink()
+        else:
+            os.replace(src, object_path)
+
+        with self.lock:
+            conn = self.get_conn()
+            row = conn.execute(
+                "SELECT object FROM covers WHERE name=?", (name,)
+            ).fetchone()
+            if not row or row[0] != object_name:
+                conn.execute(
+                    "INSERT OR REPLACE INTO covers (name, object) VALUES (?, ?)",
+                    (name, object_name),
+                )
+                conn.commit()
+                self.map_dirty = True
+
+        if time.monotonic() - self.map_saved_at >= self.map_interval:
+            self.save_nginx_map()
+        return object_path
+
+    def get_names(self) -> set:
+        with self.lock:
+            rows = self.get_conn().execute("SELECT name FROM covers").fetchall()
+        return {name for (name,) in rows}
+
+    def save_nginx_map(self):
+        """Rewrites the configured map if names were added since the last write."""
+        with self.map_lock:
+            if not self.nginx_map or not self.map_dirty:
+                return
+            self.map_dirty = False
+            self.map_saved_at = time.monotonic()
+            self.export_nginx_map(self.nginx_map)
+
+    def export_nginx_map(self, save_path: str):
+        with self.lock:
+            rows = self.get_conn().execute("SELECT name, object FROM covers").fetchall()
+        # nginx may reload at any time, so never leave a half-written map
+        tmp_path = f"{save_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for name, object_name in rows:
+                print(f"/covers/{name} /covers/{object_name};", file=f)
+        os.replace(tmp_path, save_path)
+
+
+cover_store = CoverStore(
+    root=f"{CONFIG.COVER_SAVE_PATH}/covers",
+    nginx_map=getattr(CONFIG, "COVER_NGINX_MAP", ""),
+    map_interval=getattr(CONFIG, "COVER_NGINX_MAP_INTERVAL", 60),
+)
@@ -0,0 +1,173 @@
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from _db import database
+from cover_pool import cover_pool
+from helper import helper
+from memory_guard import memory_guard
+from settings import CONFIG
+
+try:
+    import pillow_avif  # noqa: F401  registers the AVIF plugin when installed
+except ImportError:
+    pass
+
+
+def save_atomic(image: Image.Image, save_path: Path, image_format: str, quality: int):
+    tmp_path = save_path.with_name(f".{save_path.name}.part")
+    image.save(tmp_path, format=image_format.upper(), quality=quality)
+    os.replace(tmp_path, save_path)
+
+
+def make_variants(
+    src: str, widths: list, formats: list, quality: int, covers_root: str
+) -> dict:
+    """Runs in a worker process. Returns {format: {width: path under covers/}}."""
+    src_path = Path(src)
+    res = {}
+    with Image.open(src_path) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+
+        # Never upscale: widths above the original collapse to the original
+        widths = sorted({min(int(width), image.width) for width in widths})
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for image_format in formats:
+                variant_path = src_path.with_name(
+                    f"{src_path.stem}-{width}.{image_format}"
+                )
+                try:
+                    save_atomic(resized, variant_path, image_format, quality)
+                except (KeyError, OSError):
+                    # Format not supported by this Pillow build, e.g. AVIF
+                    continue
+                res.setdefault(image_format, {})[width] = str(
+                    variant_path.relative_to(covers_root)
+                )
+
+    sidecar = src_path.with_name(f"{src_path.stem}.variants.json")
+    with open(sidecar, "w") as f:
+        json.dump(res, f)
+
+    return res
+
+
+class CoverVariants:
+    """Process pool that transcodes saved covers into WebP/AVIF thumbnails."""
+
+    def __init__(
+        self,
+        widths: list,
+        formats: list,
+        quality: int = 80,
+        max_workers: int = None,
+    ):
+        self.widths = widths
+        self.formats = formats
+        self.quality = quality
+        self.max_workers = max_workers
+        # Made up front, not from the cover_pool thread that first needs it
+        self.executor = self.create_executor() if self.enabled else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.widths and self.formats)
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        # forkserver: workers fork from a clean single-threaded server, never
+        # from the crawler, whose threads may hold logging or sqlite locks.
+        # No process starts until the first submit.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = self.create_executor()
+        return self.executor
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def has_variants(self, image_name: str) -> bool:
+        saved_path = cover_pool.get_saved_path(image_name)
+        if not saved_path:
+            return False
+        return saved_path.with_name(f"{saved_path.stem}.variants.json").is_file()
+
+    def submit(self, src: str) -> Future:
+        return self.get_executor().submit(
+            make_variants,
+            src,
+            self.widths,
+            self.formats,
+            self.quality,
+            str(Path(CONFIG.COVER_SAVE_PATH) / "covers"),
+        )
+
+    def get_thumb_name(self, variants: dict) -> str:
+        """Smallest variant at least THUMB_WIDTH wide, in the preferred format."""
+        for image_format in [getattr(CONFIG, "THUMB_FORMAT", "webp")] + self.formats:
+            sizes = variants.get(image_format)
+            if not sizes:
+                continue
+
+            target = getattr(CONFIG, "THUMB_WIDTH", 0)
+            widths = sorted(int(width) for width in sizes.keys())
+            suitable = [width for width in widths if width >= target] or widths[-1:]
+            return sizes[suitable[0]]
+
+        return ""
+
+    def update_thumb(self, movie_id: int, variants: dict):
+        thumb_name = self.get_thumb_name(variants)
+        if not thumb_name:
+            return
+
+        database.update_table(
+            table="movie",
+            set_cond="thumb=%s",
+            where_cond=f"id={movie_id}",
+            data=(f"{CONFIG.DOMAIN_NAME}/covers/{thumb_name}",),
+        )
+        logging.info(f"[+] Movie {movie_id} thumb -> {thumb_name}")
+
+    def schedule(self, cover_future: Future, movie_id: int):
+        """Transcode once the cover has been saved, then point movie.thumb at it."""
+
+        def on_variants(future: Future):
+            try:
+                self.update_thumb(movie_id, future.result())
+            except Exception as e:
+                helper.error_log(
+                    f"Failed to make cover variants for movie {movie_id}\n{e}",
+                    log_file="cover_variants.log",
+                )
+
+        def on_cover(future: Future):
+            saved_path = future.result()
+            if saved_path:
+                self.submit(saved_path).add_done_callback(on_variants)
+
+        cover_future.add_done_callback(on_cover)
+
+
+cover_variants = CoverVariants(
+    widths=getattr(CONFIG, "COVER_VARIANT_WIDTHS", []),
+    formats=getattr(CONFIG, "COVER_VARIANT_FORMATS", ["webp"]),
+    quality=getattr(CONFIG, "COVER_VARIANT_QUALITY", 80),
+    max_workers=getattr(CONFIG, "COVER_VARIANT_WORKERS", None),
+)
+memory_guard.add_cleanup(cover_variants.shutdown)
@@ -0,0 +1,197 @@
+import atexit
+import gzip
+import hashlib
+import os
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from memory_guard import memory_guard
+from settings import CONFIG
+
+
+class ErrorLogWriter:
+    """Queue-backed writer behind Helper.error_log.
+
+    Callers only enqueue. A daemon thread writes batches grouped by log file,
+    rotates files by size, moves large payloads (page HTML) into a gzip sidecar
+    and folds repeats of the same error into a single summary line. Each
+    sidecar is one gzip stream, kept open and sync-flushed after every batch
+    so it can be read while it grows; it is closed on flush() and rotation.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "log",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        compress_over: int = 4096,
+        repeat_window: float = 60,
+        repeat_limit: int = 5,
+        max_queue: int = 10000,
+    ):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress_over = compress_over
+        self.repeat_window = repeat_window
+        self.repeat_limit = repeat_limit
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.repeats = {}
+        self.dropped = 0
+        self.payload_files = {}
+        self.thread = None
+        self.lock = threading.Lock()
+        self.payload_lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.log_dir.mkdir(parents=True, exist_ok=True)
+                self.thread = threading.Thread(
+                    target=self.run, name="error-log", daemon=True
+                )
+                self.thread.start()
+                atexit.register(self.flush)
+                memory_guard.add_cleanup(self.flush)
+
+    def log(self, msg: str, log_file: str):
+        self.start()
+        try:
+            self.queue.put_nowait((datetime.now(), log_file, msg))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def flush(self):
+        self.queue.join()
+        self.close_payloads()
+
+    def close_payloads(self):
+        with self.payload_lock:
+            for f in self.payload_files.values():
+                f.close()
+            self.payload_files = {}
+
+    def run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.repeat_window)]
+            except queue.Empty:
+                batch = []
+            try:
+                while len(batch) < 500:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                self.write_batch(batch)
+            except Exception:
+                pass
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def sweep_repeats(self, now: datetime, lines: dict):
+        for key, (started, count, first_line) in list(self.repeats.items()):
+            if (now - started).total_seconds() <= self.repeat_window:
+                continue
+            del self.repeats[key]
+            if count > self.repeat_limit:
+                log_file = key[0]
+                lines.setdefault(log_file, []).append(
+                    self.format_line(
+                        now,
+                        f"Suppressed {count - self.repeat_limit} repeats of: {first_line}",
+                    )
+                )
+
+    def is_repeated(self, now: datetime, log_file: str, msg: str) -> bool:
+        # Whole message: errors sharing a first line differ in the exception
+        key = (log_file, hashlib.sha1(msg.encode(errors="replace")).digest())
+        started, count, first_line = self.repeats.get(
+            key, (now, 0, msg.split("\n", 1)[0])
+        )
+        self.repeats[key] = (started, count + 1, first_line)
+        return count >= self.repeat_limit
+
+    def format_line(self, now: datetime, msg: str) -> str:
+        datetime_msg = now.strftime("%Y-%m-%d %H:%M:%S")
+        return f"{datetime_msg} LOG:  {msg}\n{'-' * 80}\n"
+
+    def get_payload_file(self, payload_file: Path):
+        f = self.payload_files.get(payload_file)
+        if (
+            f is not None
+            and self.max_bytes
+            and payload_file.stat().st_size >= self.max_bytes
+        ):
+            f.close()
+            f = None
+        if f is None:
+            self.rotate(payload_file)
+            f = self.payload_files[payload_file] = gzip.open(payload_file, "ab")
+        return f
+
+    def compress_payload(self, now: datetime, log_file: str, msg: str) -> str:
+        head, _, payload = msg.partition("\n")
+        payload_file = self.log_dir / f"{log_file}.payloads.gz"
+        with self.payload_lock:
+            self.get_payload_file(payload_file).write(
+                self.format_line(now, msg).encode(errors="replace")
+            )
+
+        return f"{head}\n[{len(payload)} bytes of payload in {payload_file.name}]"
+
+    def write_batch(self, batch: list):
+        lines = {}
+        self.sweep_repeats(datetime.now(), lines)
+        for now, log_file, msg in batch:
+            if self.is_repeated(now, log_file, msg):
+                continue
+            if self.compress_over and len(msg) > self.compress_over:
+                msg = self.compress_payload(now, log_file, msg)
+            lines.setdefault(log_file, []).append(self.format_line(now, msg))
+
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.setdefault("failed.log", []).append(
+                self.format_line(datetime.now(), f"Dropped {dropped} log entries")
+            )
+
+        with self.payload_lock:
+            for f in self.payload_files.values():
+                f.flush()
+
+        for log_file, log_lines in lines.items():
+            path = self.log_dir / log_file
+            self.rotate(path)
+            with open(path, "a") as f:
+                f.writelines(log_lines)
+
+    def rotate(self, path: Path):
+        if not self.max_bytes or not path.is_file():
+            return
+        if path.stat().st_size < self.max_bytes:
+            return
+
+        for i in range(self.backup_count - 1, 0, -1):
+            src = path.with_name(f"{path.name}.{i}")
+            if src.is_file():
+                os.replace(src, path.with_name(f"{path.name}.{i + 1}"))
+        if self.backup_count:
+            os.replace(path, path.with_name(f"{path.name}.1"))
+        else:
+            path.unlink()
+
+
+error_log_writer = ErrorLogWriter(
+    max_bytes=getattr(CONFIG, "LOG_MAX_BYTES", 10 * 1024 * 1024),
+    backup_count=getattr(CONFIG, "LOG_BACKUP_COUNT", 5),
+    compress_over=getattr(CONFIG, "LOG_COMPRESS_OVER", 4096),
+    repeat_window=getattr(CONFIG, "LOG_REPEAT_WINDOW", 60),
+    repeat_limit=getattr(CONFIG, "LOG_REPEAT_LIMIT", 5),
+)
@@ -0,0 +1,59 @@
+import atexit
+import gzip
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from memory_guard import memory_guard
+from settings import CONFIG
+
+
+class FilmExporter:
+    """Streams normalized film records to rotating, gzip-compressed JSONL files.
+
+    Used by the export crawl mode for backfills; load_export.py ingests the
+    files in bulk.
+    """
+
+    def __init__(self, save_dir: str = "export", max_records: int = 5000):
+        self.save_dir = Path(save_dir)
+        self.max_records = max_records
+        self.lock = threading.Lock()
+        self.file = None
+        self.records = 0
+        self.file_index = 0
+        atexit.register(self.close)
+        memory_guard.add_cleanup(self.close)
+
+    def open_next(self):
+        self.close()
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.file_index += 1
+        path = self.save_dir / f"films-{stamp}-{self.file_index:04d}.jsonl.gz.part"
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.records = 0
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            if self.file is None or self.records >= self.max_records:
+                self.open_next()
+            self.file.write(line + "\n")
+            self.records += 1
+
+    def close(self):
+        # Files are renamed only when complete, so the loader never reads a partial one
+        if self.file is None:
+            return
+        path = Path(self.file.name)
+        self.file.close()
+        self.file = None
+        path.rename(path.with_suffix(""))
+
+
+film_exporter = FilmExporter(
+    save_dir=getattr(CONFIG, "EXPORT_DIR", "export"),
+    max_records=getattr(CONFIG, "EXPORT_MAX_RECORDS", 5000),
+)
@@ -2,32 +2,44 @@ import json
 import logging
 import re
 from datetime import datetime, timedelta
-from pathlib import Path
 from urllib.parse import urlparse
 
-import requests
 from slugify import slugify
 
 from _db import database
+from cover_pool import cover_pool
+from cover_variants import cover_variants
 from helper import helper
+from http_client import http_client
+from profiler import profiler
+from proxy_pool import proxy_pool
+from records import FilmRecord, MovieRecord, PlayerRecord
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 
 
 class HDToday:
-    def __init__(self, film: dict, episodes: dict):
+    def __init__(
+        self,
+        film: FilmRecord,
+        episodes: dict,
+        refresh_cover: bool = False,
+        fetch_cover: bool = True,
+    ):
+        if isinstance(film, dict):
+            film = FilmRecord.from_dict(film)
         self.film = film
-        self.film["quality"] = self.film["extra_info"].get("quality", "HD")
-        self.film["tmdb_id"] = self.film["extra_info"].get("tmdb_id", "")
-        self.film["origin_cover_src"] = self.film["cover_src"]
         self.episodes = episodes
-        self.download_cover()
+        self.refresh_cover = refresh_cover or getattr(CONFIG, "REFRESH_COVERS", False)
+        # False: never download, keep the covers/ URL of whatever is on disk
+        self.fetch_cover = fetch_cover
+        self.cover_future = None
 
     def get_header(self):
         header = {
             "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E150",  # noqa: E501
-            "Accept-Encoding": "gzip, deflate",
+            "Accept-Encoding": http_client.accept_encoding,
             # "Cookie": CONFIG.COOKIE,
             "Cache-Control": "max-age=0",
             "Accept-Language": "vi-VN",
@@ -36,35 +48,59 @@ class HDToday:
         return header
 
     def download_url(self, url):
-        return requests.get(url, headers=self.get_header())
+        return proxy_pool.get(url, headers=self.get_header())
 
     def save_thumb(
         self,
         imageUrl: str,
         imageName: str = "0.jpg",
+        force: bool = False,
     ) -> str:
-        Path(CONFIG.COVER_SAVE_PATH).mkdir(parents=True, exist_ok=True)
-        saveImage = f"{CONFIG.COVER_SAVE_PATH}/covers/{imageName}"
-
-        isNotSaved = not Path(saveImage).is_file()
-        if isNotSaved:
-            image = self.download_url(imageUrl)
-            with open(saveImage, "wb") as f:
-                f.write(image.content)
-            isNotSaved = True
+        self.cover_future = cover_pool.submit(
+            imageUrl, imageName, headers=self.get_header(), force=force
+        )
 
         return f"{CONFIG.DOMAIN_NAME}/covers/{imageName}"
 
-    def download_cover(self) -> None:
-        cover_url = self.film["cover_src"]
+    def get_cover_name(self) -> str:
+        cover_url = self.film.origin_cover_src
         image_extension = cover_url.split("/")[-1].split(".")[-1]
-        if image_extension:
-            downloaded_cover_name = f"{self.film['slug']}.{image_extension}"
-            downloaded_cover_url = self.save_thumb(cover_url, downloaded_cover_name)
-            self.film["cover_src"] = downloaded_cover_url
+        if not image_extension:
+            return ""
+
+        return f"{self.film.slug}.{image_extension}"
+
+    def download_cover(self, force: bool = False) -> None:
+        downloaded_cover_name = self.get_cover_name()
+        if not downloaded_cover_name:
+            return
+
+        if self.fetch_cover:
+            downloaded_cover_url = self.save_thumb(
+                self.film.origin_cover_src, downloaded_cover_name, force=force
+            )
+        else:
+            if not cover_pool.is_saved(downloaded_cover_name):
+                helper.error_log(
+                    f"Cover not on disk: {downloaded_cover_name}",
+                    "hdtoday.missing_cover.log",
+                )
+            downloaded_cover_url = (
+                f"{CONFIG.DOMAIN_NAME}/covers/{downloaded_cover_name}"
+            )
+        self.film.cover_src = downloaded_cover_url
+
+    def check_cover(self) -> None:
+        """Existing films only stat the cover file; the pool fetches it if missing
+        or when refresh mode asks for it."""
+        self.download_cover(force=self.refresh_cover)
+
+    def schedule_cover_variants(self, movie_id: int) -> None:
+        if movie_id and self.cover_future and cover_variants.enabled:
+            cover_variants.schedule(self.cover_future, movie_id)
 
     def get_season_number(self) -> str:
-        season_str = self.film["slug"]
+        season_str = self.film.slug
         season_str = season_str.replace("\n", " ").lower()
         regex = re.compile(r"season-(\d+)")
         match = regex.search(season_str)
@@ -73,57 +109,6 @@ class HDToday:
         else:
             return "1"
 
-    def generate_film_data(
-        self,
-        title,
-        slug,
-        description,
-        post_type,
-        trailer_id,
-        quality,
-        fondo_player,
-        poster_url,
-        extra_info,
-    ):
-        post_data = {
-            "description": description,
-            "title": title,
-            "slug": slug,
-            "post_type": post_type,
-            # "id": "202302",
-            "youtube_id": trailer_id,
-            "quality": quality,
-            # "serie_vote_average": extra_info["IMDb"],
-            # "episode_run_time": extra_info["Duration"],
-            "fondo_player": fondo_player,
-            "poster_url": poster_url,
-            # "category": extra_info["Genre"],
-            # "stars": extra_info["Actor"],
-            # "director": extra_info["Director"],
-            # "release-year": [extra_info["Release"]],
-            # "country": extra_info["Country"],
-        }
-
-        key_mapping = {
-            "imdb": "imdb",
-            "Duration": "duration",
-            "Genre": "genre",
-            "Casts": "cast",
-            "Starring": "cast",
-            "Creator": "director",
-            "Created by": "director",
-            "Director": "director",
-            "Country": "country",
-            # "Released": "year",
-            "Year": "year",
-        }
-
-        for info_key in key_mapping.keys():
-            if info_key in extra_info.keys():
-                post_data[key_mapping[info_key]] = extra_info[info_key]
-
-        return post_data
-
     def get_timeupdate(self) -> datetime:
         timeupdate = datetime.now() - timedelta(hours=10)
 
@@ -157,83 +142,113 @@ class HDToday:
         except:
             return 0
 
-    def insert_movie(self, post_data: dict) -> int:
+    def get_movie(self) -> MovieRecord:
+        """Movie row, with genre and country still as lists of names."""
+        timeupdate = self.get_timeupdate()
+        genre_names = self.film.get_extra("genre").split(",")
+        country_names = self.film.get_extra("country").split(",")
+        cast_names = self.film.get_extra("cast").split(",")
+        for name in country_names:
+            if name in genre_names:
+                genre_names = genre_names.remove(name)
+            if name in cast_names:
+                cast_names.remove(name)
+        duration = self.film.get_extra("duration")
+        director = self.film.get_extra("director", [])
+        if isinstance(director, str):
+            director = director.split(",")
+        return MovieRecord(
+            name=self.film.title,
+            origin_name=self.film.title,
+            thumb=self.film.cover_src,
+            keyword=self.film.title,
+            genre=genre_names,
+            cast=json.dumps(cast_names),
+            country=country_names,
+            director=json.dumps(director),
+            duration=f"{duration}" if duration else "",
+            trailer=""
+            if not self.film.title
+            else "https://www.youtube.com/embed/" + self.film.trailer_id,
+            quality=self.film.quality,
+            year=self.film.get_extra("year", 0),
+            slug=self.film.slug,
+            content=self.film.description,
+            type=self.film.post_type,
+            status="ongoing",
+            imdb=self.get_imdb_from(self.film.get_extra("imdb")),
+            time=timeupdate.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+    def insert_movie(self) -> int:
         try:
-            timeupdate = self.get_timeupdate()
-            genre_names = post_data.get("genre", "").split(",")
-            country_names = post_data.get("country", "").split(",")
-            cast_names = post_data.get("cast", "").split(",")
-            for name in country_names:
-                if name in genre_names:
-                    genre_names = genre_names.remove(name)
-                if name in cast_names:
-                    cast_names.remove(name)
-            duration = post_data.get("duration", "")
-            director = post_data.get("director", [])
-            if isinstance(director, str):
-                director = director.split(",")
-            movie = {
-                "name": post_data.get("title", ""),
-                "origin_name": post_data.get("title", ""),
-                "thumb": post_data.get("poster_url", ""),
-                "keyword": post_data.get("title", ""),
-                "genre": self.get_slug_list_from(table="genre", names=genre_names),
-                "cast": json.dumps(cast_names),
-                "country": self.get_slug_list_from(
-                    table="country", names=country_names
-                ),
-                "director": json.dumps(director),
-                "duration": f"{duration}" if duration else "",
-                "trailer": ""
-                if not post_data.get("title", "")
-                else "https://www.youtube.com/embed/" + post_data.get("youtube_id", ""),
-                "quality": post_data.get("quality", "HD"),
-                "year": post_data.get("year", 0),
-                "slug": post_data.get("slug", ""),
-                "content": post_data.get("description", ""),
-                "type": post_data.get("post_type", ""),
-                "status": "ongoing",
-                "imdb": self.get_imdb_from(post_data.get("imdb", "")),
-                "liked": 0,
-                "disliked": 0,
-                "view": 0,
-                "view_d": 0,
-                "view_m": 0,
-                "view_w": 0,
-                "view_y": 0,
-                "time": timeupdate.strftime("%Y-%m-%d %H:%M:%S"),
-            }
+            movie = self.get_movie()
+            movie.genre = self.get_slug_list_from(table="genre", names=movie.genre)
+            movie.country = self.get_slug_list_from(
+                table="country", names=movie.country
+            )
             post_id = database.insert_into(table="movie", data=list(movie.values()))
 
             return post_id
         except Exception as e:
             helper.error_log(
-                f'Failed to insert film: {post_data.get("title", "")}\n{e}',
+                f"Failed to insert film: {self.film.title}\n{e}",
                 "hdtoday.insert_movie.log",
             )
             return 0
 
-    def insert_root_film(self) -> list:
-        condition = (
-            f"""slug = '{self.film["slug"]}' AND type='{self.film["post_type"]}'"""
-        )
-        be_post = database.select_all_from(table=f"movie", condition=condition)
-        if not be_post:
-            logging.info(f'Inserting root film: {self.film["post_title"]}')
-            post_data = self.generate_film_data(
-                self.film["post_title"],
-                self.film["slug"],
-                self.film["description"],
-                self.film["post_type"],
-                self.film["trailer_id"],
-                self.film["quality"],
-                self.film["cover_src"],
-                self.film["cover_src"],
-                self.film["extra_info"],
+    def update_movie(self, movie_id: int) -> None:
+        """Rewrites the crawled columns of an existing movie; counters are kept."""
+        try:
+            movie = self.get_movie()
+            movie.genre = self.get_slug_list_from(table="genre", names=movie.genre)
+            movie.country = self.get_slug_list_from(
+                table="country", names=movie.country
+            )
+            cols = [
+                "name",
+                "origin_name",
+                "keyword",
+                "genre",
+                "cast",
+                "country",
+                "director",
+                "duration",
+                "trailer",
+                "quality",
+                "year",
+                "content",
+                "imdb",
+            ]
+            database.update_table(
+                table="movie",
+                set_cond=", ".join(f"`{col}`=%s" for col in cols),
+                where_cond=f"id={movie_id}",
+                data=tuple(movie[col] for col in cols),
+            )
+        except Exception as e:
+            helper.error_log(
+                f"Failed to update film: {self.film.title}\n{e}",
+                "hdtoday.update_movie.log",
             )
 
-            return self.insert_movie(post_data)
+    def insert_root_film(self, update_existing: bool = False) -> list:
+        condition = f"""slug = '{self.film.slug}' AND type='{self.film.post_type}'"""
+        be_post = database.select_all_from(table=f"movie", condition=condition)
+        if not be_post:
+            logging.info(f"Inserting root film: {self.film.post_title}")
+            self.download_cover()
+            movie_id = self.insert_movie()
+            self.schedule_cover_variants(movie_id)
+            return movie_id
         else:
+            self.check_cover()
+            if update_existing:
+                self.update_movie(be_post[0][0])
+            if self.refresh_cover or not cover_variants.has_variants(
+                self.get_cover_name()
+            ):
+                self.schedule_cover_variants(be_post[0][0])
             return be_post[0][0]
 
     def validate_movie_episodes(self) -> None:
@@ -305,7 +320,7 @@ class HDToday:
             episodes[ep_name] = ep_links
 
         for ep_name, ep_links in episodes.items():
-            if self.film["post_type"] == CONFIG.TYPE_MOVIE:
+            if self.film.post_type == CONFIG.TYPE_MOVIE:
                 episode_name = f""
                 episode_number = "1"
             else:
@@ -328,28 +343,18 @@ class HDToday:
 
         return netloc
 
-    def insert_player(self, movie_id: int) -> None:
-        logging.info(
-            f"Updating player for movie {self.film['post_title']} with ID: {movie_id}"
-        )
-
+    def get_player_data(self) -> str:
         episode_server = []
 
-        servers_link = self.film.get("servers_link", [])
-        if self.film.get("tmdb_id", ""):
-            servers_link.append(
-                f"https://vidsrc.me/embed/{self.film.get('tmdb_id', '')}"
-            )
+        servers_link = self.film.servers_link
+        if self.film.tmdb_id:
+            servers_link.append(f"https://vidsrc.me/embed/{self.film.tmdb_id}")
 
         servers_link = list(set(servers_link))
 
         for index, link in enumerate(servers_link):
             episode_server.append(
-                {
-                    "server_name": f"Server {index + 1}",
-                    "server_type": "embed",
-                    "server_link": f"{link}/",
-                }
+                PlayerRecord(f"Server {index + 1}", f"{link}/").to_dict()
             )
 
         data = [
@@ -366,7 +371,14 @@ class HDToday:
             }
         ]
 
-        data = json.dumps(data)
+        return json.dumps(data)
+
+    def insert_player(self, movie_id: int) -> bool:
+        logging.info(
+            f"Updating player for movie {self.film.post_title} with ID: {movie_id}"
+        )
+
+        data = self.get_player_data()
 
         be_episode_data = database.select_or_insert(
             table="episode", condition=f"movie_id={movie_id}", data=(movie_id, data)
@@ -388,11 +400,24 @@ class HDToday:
                 set_cond=f"""data='{escape_data}'""",
                 where_cond=f"movie_id={movie_id}",
             )
+            return True
+
+        return False
 
-    def insert_film(self):
-        self.film["post_title"] = self.film["title"]
+    def get_record(self) -> dict:
+        """Normalized movie and player data for the JSONL export, no DB access."""
+        self.download_cover()
+
+        return {
+            "movie": self.get_movie().to_dict(),
+            "player": self.get_player_data(),
+        }
 
-        post_id = self.insert_root_film()
+    @profiler.profile_film(
+        lambda self, *args, **kwargs: (self.film.slug, self.film.href)
+    )
+    def insert_film(self, update_existing: bool = False):
+        post_id = self.insert_root_film(update_existing=update_existing)
         if not post_id:
             return
 
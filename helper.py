@@ -1,14 +1,16 @@
 import re
 import string
 from datetime import datetime, timedelta
-from pathlib import Path
 from time import sleep
 
-import requests
 from bs4 import BeautifulSoup
 from slugify import slugify
 
 from _db import database
+from error_log import error_log_writer
+from http_client import http_client
+from metrics import metrics
+from mirrors import mirror_pool
 from settings import CONFIG
 
 
@@ -16,7 +18,7 @@ class Helper:
     def get_header(self):
         header = {
             "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E150",  # noqa: E501
-            "Accept-Encoding": "gzip, deflate",
+            "Accept-Encoding": http_client.accept_encoding,
             # "Cookie": CONFIG.COOKIE,
             "Cache-Control": "max-age=0",
             "Accept-Language": "vi-VN",
@@ -25,13 +27,10 @@ class Helper:
         return header
 
     def error_log(self, msg: str, log_file: str = "failed.log"):
-        datetime_msg = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        Path("log").mkdir(parents=True, exist_ok=True)
-        with open(f"log/{log_file}", "a") as f:
-            print(f"{datetime_msg} LOG:  {msg}\n{'-' * 80}", file=f)
+        error_log_writer.log(msg, log_file)
 
-    def download_url(self, url):
-        return requests.get(url, headers=self.get_header())
+    def download_url(self, url, **kwargs):
+        return mirror_pool.get(url, headers=self.get_header(), **kwargs)
 
     def format_text(self, text: str) -> str:
         return text.strip("\n").replace('"', "'").strip().replace("’", "'")
@@ -39,6 +38,11 @@ class Helper:
     def format_slug(self, slug: str) -> str:
         return slug.replace("’", "").replace("'", "")
 
+    def get_post_type_from(self, href: str) -> str:
+        if "/tv/" in href:
+            return CONFIG.TYPE_TV_SHOWS
+        return CONFIG.TYPE_MOVIE
+
     def add_https_to(self, url: str) -> str:
         if not url:
             return url
@@ -48,6 +52,7 @@ class Helper:
 
         return url
 
+    @metrics.timed("extract_seconds")
     def get_trailer_id(self, soup: BeautifulSoup) -> str:
         try:
             iframe = soup.find("iframe", {"id": "iframe-trailer"})
@@ -57,6 +62,7 @@ class Helper:
         except:
             return ""
 
+    @metrics.timed("extract_seconds")
     def get_servers_link(self, soup: BeautifulSoup) -> list:
         res = []
         try:
@@ -82,6 +88,7 @@ class Helper:
 
         return res
 
+    @metrics.timed("extract_seconds")
     def get_watching_href_and_fondo(self, soup: BeautifulSoup) -> list:
         try:
             main_detail = soup.find("div", class_="main-detail")
@@ -133,6 +140,7 @@ class Helper:
             self.get_season_number(self.format_text(season_number)),
         ]
 
+    @metrics.timed("extract_seconds")
     def get_title(self, href: str, detail_page_infor: BeautifulSoup) -> str:
         try:
             heading_name = detail_page_infor.find(
@@ -146,6 +154,7 @@ class Helper:
             )
             return ""
 
+    @metrics.timed("extract_seconds")
     def get_description(self, href: str, detail_page_infor: BeautifulSoup) -> str:
         try:
             description = (
@@ -161,6 +170,7 @@ class Helper:
             )
             return ""
 
+    @metrics.timed("extract_seconds")
     def get_title_and_description(self, soup: BeautifulSoup) -> list:
         try:
             mvi_content = soup.find("div", class_="mvi-content")
@@ -178,6 +188,7 @@ class Helper:
             )
             return ["", ""]
 
+    @metrics.timed("extract_seconds")
     def get_cover_url(self, href: str, detail_page_infor: BeautifulSoup) -> str:
         try:
             dm_thumb = detail_page_infor.find("div", class_="dp-i-c-poster")
@@ -221,6 +232,7 @@ class Helper:
             res["Duration"] = res["Duration"].replace("min", "").strip()
         return res
 
+    @metrics.timed("extract_seconds")
     def get_imdb_score(self, detail_page_infor: BeautifulSoup) -> str:
         try:
             dp_i_stats = detail_page_infor.find("div", class_="dp-i-stats")
@@ -232,6 +244,7 @@ class Helper:
         except:
             return ""
 
+    @metrics.timed("extract_seconds")
     def get_extra_info(self, detail_page_infor: BeautifulSoup) -> dict:
         extra_info = {}
         try:
@@ -0,0 +1,183 @@
+import logging
+import threading
+
+import requests
+
+from settings import CONFIG
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  httpx only speaks HTTP/2 with the h2 extra installed
+except ImportError:
+    h2 = None
+
+try:
+    import brotli  # noqa: F401  lets httpx decode Content-Encoding: br
+except ImportError:
+    try:
+        import brotlicffi as brotli  # noqa: F401
+    except ImportError:
+        brotli = None
+
+
+class RequestsBackend:
+    """The default client: one requests.get, so one HTTP/1.1 connection, per
+    request."""
+
+    name = "requests"
+    accept_encoding = "gzip, deflate"
+
+    def get(self, url: str, **kwargs):
+        return requests.get(url, **kwargs)
+
+    def close(self):
+        pass
+
+
+class BodyReader:
+    """File-like over the decoded body, for code that reads response.raw."""
+
+    decode_content = True
+
+    def __init__(self, response):
+        self.response = response
+        self.chunks = response.iter_bytes()
+        self.buffer = b""
+
+    def tell(self) -> int:
+        """Bytes received from the wire so far, like urllib3's tell()."""
+        return self.response.num_bytes_downloaded
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Http2Response:
+    """The parts of requests.Response the crawler uses, over an httpx one."""
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self.raw = BodyReader(response)
+
+    @property
+    def content(self) -> bytes:
+        return self.response.read()
+
+    @property
+    def text(self) -> str:
+        self.response.read()
+        return self.response.text
+
+    def iter_content(self, chunk_size: int = 1):
+        try:
+            yield from self.response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e) from e
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+    def close(self):
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Http2Backend:
+    """httpx with HTTP/2 (pip install "httpx[http2,brotli]").
+
+    Requests from every thread to one host go out as multiplexed streams
+    over a few long-lived connections instead of a new connection each, and
+    brotli is advertised when a brotli module is installed. httpx binds a
+    proxy per client, so there is one client per proxy. Errors are raised as
+    requests exceptions so proxy_pool's handling does not change.
+    prior_knowledge speaks HTTP/2 over plain http (h2c), for local testing.
+    """
+
+    name = "http2"
+
+    def __init__(self, max_connections: int = 10, prior_knowledge: bool = False):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.http1 = not prior_knowledge
+        self.accept_encoding = "br, gzip, deflate" if brotli else "gzip, deflate"
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def get_client(self, proxy: str = None):
+        with self.lock:
+            if proxy not in self.clients:
+                self.clients[proxy] = httpx.Client(
+                    http2=True,
+                    http1=self.http1,
+                    proxy=proxy,
+                    limits=self.limits,
+                    follow_redirects=True,
+                )
+            return self.clients[proxy]
+
+    def get(
+        self,
+        url: str,
+        headers: dict = None,
+        proxies: dict = None,
+        timeout: float = 30,
+        stream: bool = False,
+    ) -> Http2Response:
+        proxy = (proxies or {}).get("https" if url.startswith("https") else "http")
+        client = self.get_client(proxy)
+        try:
+            request = client.build_request("GET", url, headers=headers, timeout=timeout)
+            response = client.send(request, stream=True)
+            if not stream:
+                response.read()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e) from e
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e) from e
+        return Http2Response(response)
+
+    def close(self):
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients = {}
+
+
+def get_backend(name: str, max_connections: int = 10):
+    if name == "http2":
+        if httpx is not None and h2 is not None:
+            return Http2Backend(max_connections=max_connections)
+        logging.warning('HTTP_BACKEND "http2" needs httpx[http2], using requests')
+    return RequestsBackend()
+
+
+http_client = get_backend(
+    getattr(CONFIG, "HTTP_BACKEND", "requests"),
+    max_connections=getattr(CONFIG, "HTTP2_MAX_CONNECTIONS", 10),
+)
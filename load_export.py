@@ -0,0 +1,207 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from slugify import slugify
+
+from _db import database
+from records import iter_batches
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+
+def read_records(paths: list):
+    for path in paths:
+        logging.info(f"Reading {path}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def get_slug_list(names: list) -> str:
+    # Same value HDToday.get_slug_list_from stores: the slug column of each row
+    return json.dumps([slugify(name) for name in names or [] if slugify(name)])
+
+
+def to_tsv_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class BulkLoader:
+    """Loads exported films into movie/episode/genre/country in set-based SQL.
+
+    Each batch is staged into temporary tables, either with LOAD DATA LOCAL
+    INFILE or with multi-row inserts, and then merged: new genre/country
+    slugs, movies not yet present by (slug, type), and episode data joined to
+    movie ids in one statement per table.
+    """
+
+    def __init__(self, method: str = "insert"):
+        self.method = method
+        self.conn = database.get_conn(allow_local_infile=method == "load-data")
+        self.cur = self.conn.cursor()
+        self.movie_cols = list(CONFIG.INSERT["movie"])
+        self.create_staging_tables()
+
+    def table(self, name: str) -> str:
+        return f"{CONFIG.TABLE_PREFIX}{name}"
+
+    def create_staging_tables(self):
+        self.cur.execute(
+            f"CREATE TEMPORARY TABLE stage_movie LIKE {self.table('movie')}"
+        )
+        self.cur.execute(
+            "CREATE TEMPORARY TABLE stage_term "
+            "(kind VARCHAR(16), name VARCHAR(255), slug VARCHAR(255))"
+        )
+        self.cur.execute(
+            "CREATE TEMPORARY TABLE stage_episode "
+            "(slug VARCHAR(255), type VARCHAR(32), data LONGTEXT)"
+        )
+
+    def stage(self, table: str, cols: list, rows: list):
+        if not rows:
+            return
+
+        if self.method == "load-data":
+            fd, path = tempfile.mkstemp(suffix=".tsv")
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                for row in rows:
+                    f.write("\t".join(to_tsv_value(value) for value in row) + "\n")
+            try:
+                self.cur.execute(
+                    f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} "
+                    f"CHARACTER SET utf8mb4 ({', '.join(cols)})"
+                )
+            finally:
+                os.unlink(path)
+        else:
+            values = f"({', '.join(['%s'] * len(cols))})"
+            self.cur.executemany(
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES {values}", rows
+            )
+
+    def load_batch(self, batch: list) -> dict:
+        films = {}
+        for record in batch:
+            movie = record["movie"]
+            films[(movie["slug"], movie["type"])] = record
+
+        terms = set()
+        movie_rows = []
+        episode_rows = []
+        for (slug, post_type), record in films.items():
+            movie = dict(record["movie"])
+            for kind in ("genre", "country"):
+                names = movie.get(kind) or []
+                terms.update(
+                    (kind, name, slugify(name)) for name in names if slugify(name)
+                )
+                movie[kind] = get_slug_list(names)
+            movie_rows.append(tuple(movie.get(col, "") for col in self.movie_cols))
+            episode_rows.append((slug, post_type, record["player"]))
+
+        for staging in ("stage_movie", "stage_term", "stage_episode"):
+            self.cur.execute(f"DELETE FROM {staging}")
+        self.stage("stage_term", ["kind", "name", "slug"], sorted(terms))
+        self.stage("stage_movie", self.movie_cols, movie_rows)
+        self.stage("stage_episode", ["slug", "type", "data"], episode_rows)
+
+        counts = {}
+        for kind in ("genre", "country"):
+            self.cur.execute(
+                f"INSERT INTO {self.table(kind)} (name, slug) "
+                f"SELECT MIN(s.name), s.slug FROM stage_term s "
+                f"LEFT JOIN {self.table(kind)} t ON t.slug = s.slug "
+                f"WHERE s.kind = %s AND t.slug IS NULL GROUP BY s.slug",
+                (kind,),
+            )
+            counts[kind] = self.cur.rowcount
+
+        cols = ", ".join(self.movie_cols)
+        select_cols = ", ".join(f"s.{col}" for col in self.movie_cols)
+        self.cur.execute(
+            f"INSERT INTO {self.table('movie')} ({cols}) "
+            f"SELECT {select_cols} FROM stage_movie s "
+            f"LEFT JOIN {self.table('movie')} m ON m.slug = s.slug AND m.type = s.type "
+            f"WHERE m.id IS NULL"
+        )
+        counts["movie"] = self.cur.rowcount
+
+        self.cur.execute(
+            f"UPDATE {self.table('episode')} e "
+            f"JOIN {self.table('movie')} m ON m.id = e.movie_id "
+            f"JOIN stage_episode s ON s.slug = m.slug AND s.type = m.type "
+            f"SET e.data = s.data WHERE e.data <> s.data"
+        )
+        counts["episode_updated"] = self.cur.rowcount
+        self.cur.execute(
+            f"INSERT INTO {self.table('episode')} (movie_id, data) "
+            f"SELECT m.id, s.data FROM stage_episode s "
+            f"JOIN {self.table('movie')} m ON m.slug = s.slug AND m.type = s.type "
+            f"LEFT JOIN {self.table('episode')} e ON e.movie_id = m.id "
+            f"WHERE e.movie_id IS NULL"
+        )
+        counts["episode"] = self.cur.rowcount
+
+        self.conn.commit()
+        return counts
+
+    def close(self):
+        self.cur.close()
+        self.conn.close()
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Bulk load exported films")
+    parser.add_argument(
+        "paths", nargs="*", help="*.jsonl.gz files (default: all in EXPORT_DIR)"
+    )
+    parser.add_argument("--method", choices=["insert", "load-data"], default="insert")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument(
+        "--done-dir", default="", help="Move loaded files here afterwards"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    paths = args.paths or sorted(
+        str(path)
+        for path in Path(getattr(CONFIG, "EXPORT_DIR", "export")).glob("*.jsonl.gz")
+    )
+    if not paths:
+        logging.info("Nothing to load")
+        return
+
+    loader = BulkLoader(method=args.method)
+    try:
+        for batch in iter_batches(read_records(paths), args.batch_size):
+            counts = loader.load_batch(batch)
+            logging.info(f"[+] Loaded {len(batch)} records: {counts}")
+    finally:
+        loader.close()
+
+    if args.done_dir:
+        Path(args.done_dir).mkdir(parents=True, exist_ok=True)
+        for path in paths:
+            os.replace(path, Path(args.done_dir) / Path(path).name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+from metrics import metrics
+from settings import CONFIG
+
+RESUME_ENV = "CRAWL_RESUME"
+
+
+class MemoryGuard:
+    """RSS ceiling and memory logging for the long-running crawl loops.
+
+    Loops call check() after every film and checkpoint(**resume) between
+    pages. Once RSS passes max_rss_mb, check() starts returning True so the
+    current page can stop early, and checkpoint() runs the registered
+    cleanups (pending covers, export files, error log) and re-executes the
+    process with the resume values in CRAWL_RESUME.
+    """
+
+    def __init__(self, max_rss_mb: float = 0, log_interval: float = 300):
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.log_interval = log_interval
+        self.cleanups = []
+        self.items = 0
+        self.started = time.monotonic()
+        self.last_log = self.started
+        self.over_limit = False
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def get_rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        except (OSError, IndexError, ValueError):
+            # Peak rather than current RSS, but better than nothing off Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def add_cleanup(self, func):
+        self.cleanups.append(func)
+
+    def log_stats(self, rss: int):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        uptime = time.monotonic() - self.started
+        logging.info(
+            f"[memory] rss={rss / 1024 / 1024:.1f}MiB peak={peak:.1f}MiB "
+            f"items={self.items} uptime={uptime / 3600:.1f}h gc={gc.get_count()}"
+        )
+
+    def check(self) -> bool:
+        """Call after each film. True once the worker should be recycled."""
+        self.items += 1
+        rss = self.get_rss()
+        metrics.set("process_rss_bytes", rss)
+
+        now = time.monotonic()
+        if self.log_interval and now - self.last_log >= self.log_interval:
+            self.last_log = now
+            self.log_stats(rss)
+
+        if self.max_rss and rss > self.max_rss and not self.over_limit:
+            self.over_limit = True
+            logging.info(
+                f"[memory] rss {rss / 1024 / 1024:.1f}MiB over the "
+                f"{self.max_rss / 1024 / 1024:.0f}MiB ceiling, "
+                "recycling after this item"
+            )
+        return self.over_limit
+
+    def get_resume(self, key: str, default=None):
+        try:
+            return json.loads(os.environ.get(RESUME_ENV, "{}")).get(key, default)
+        except ValueError:
+            return default
+
+    def recycle(self, **resume):
+        for cleanup in self.cleanups:
+            try:
+                cleanup()
+            except Exception as e:
+                logging.info(f"[memory] cleanup {cleanup} failed: {e}")
+
+        self.log_stats(self.get_rss())
+        logging.info(f"[memory] re-executing worker, resume={resume}")
+        os.environ[RESUME_ENV] = json.dumps(resume)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def checkpoint(self, **resume):
+        """Call between units of work; re-execs if check() hit the ceiling."""
+        if self.over_limit:
+            self.recycle(**resume)
+
+
+memory_guard = MemoryGuard(
+    max_rss_mb=getattr(CONFIG, "MAX_RSS_MB", 0),
+    log_interval=getattr(CONFIG, "MEMORY_LOG_INTERVAL", 300),
+)
@@ -0,0 +1,205 @@
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import CONFIG
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_label_key(labels: dict) -> tuple:
+    # Values are rendered as text anyway; strings keep mixed int/str labels sortable
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{key}="{escape_label(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """In-process counters, gauges and histograms in Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self.histograms = {}
+        self.local = threading.local()
+        self.listeners = defaultdict(list)
+
+    def subscribe(self, name: str, callback):
+        """callback(value, labels) runs on every inc/observe of the metric `name`."""
+        self.listeners[name].append(callback)
+
+    def notify(self, name: str, value: float, labels: dict):
+        for callback in self.listeners.get(name, ()):
+            callback(value, labels)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, get_label_key(labels))
+        with self.lock:
+            self.counters[key] += value
+        self.notify(name, value, dict(key[1]))
+
+    def set(self, name: str, value: float, **labels):
+        key = (name, get_label_key(labels))
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name: str, value: float, buckets: tuple = BUCKETS, **labels):
+        key = (name, get_label_key(labels))
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key,
+                {
+                    "buckets": buckets,
+                    "counts": [0] * len(buckets),
+                    "sum": 0,
+                    "count": 0,
+                },
+            )
+            for i, bound in enumerate(histogram["buckets"]):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+        self.notify(name, value, dict(key[1]))
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator recording the call duration, labelled with the function name."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, func=func.__name__, **labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def db_call(self, func):
+        """Decorator for Database methods: latency plus a per-thread round trip count."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.local.db_calls = getattr(self.local, "db_calls", 0) + 1
+            self.inc("db_round_trips_total", method=func.__name__)
+            try:
+                with self.timer("db_query_seconds", method=func.__name__):
+                    return func(*args, **kwargs)
+            except Exception:
+                self.inc("db_errors_total", method=func.__name__)
+                raise
+
+        return wrapper
+
+    @contextmanager
+    def film(self, post_type: str = ""):
+        """Wraps one film: duration, throughput and DB round trips for it."""
+        start = time.perf_counter()
+        db_calls = getattr(self.local, "db_calls", 0)
+        try:
+            yield
+        finally:
+            self.observe(
+                "film_seconds", time.perf_counter() - start, post_type=post_type
+            )
+            self.observe(
+                "db_round_trips_per_film",
+                getattr(self.local, "db_calls", 0) - db_calls,
+                buckets=COUNT_BUCKETS,
+                post_type=post_type,
+            )
+            self.inc("films_total", post_type=post_type)
+
+    def render(self) -> str:
+        lines = []
+        typed = set()
+
+        def add_type(name: str, metric_type: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                add_type(name, "counter")
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                add_type(name, "gauge")
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                add_type(name, "histogram")
+                for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                    le = format_labels(labels, 'le="%s"' % bound)
+                    lines.append(f"{name}_bucket{le} {count}")
+                le = format_labels(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{le} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+                lines.append(
+                    f"{name}_count{format_labels(labels)} {histogram['count']}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1"):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def start_file_writer(self, path: str, interval: float = 15):
+        def write_forever():
+            while True:
+                time.sleep(interval)
+                with open(f"{path}.tmp", "w") as f:
+                    f.write(self.render())
+                # Atomic so node_exporter's textfile collector never reads a partial file
+                os.replace(f"{path}.tmp", path)
+
+        threading.Thread(target=write_forever, daemon=True).start()
+
+    def start(self):
+        port = getattr(CONFIG, "METRICS_PORT", 0)
+        if port:
+            self.start_http_server(port)
+        path = getattr(CONFIG, "METRICS_FILE", "")
+        if path:
+            self.start_file_writer(path, getattr(CONFIG, "METRICS_FILE_INTERVAL", 15))
+
+
+metrics = Metrics()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cover_store import cover_store
+from helper import helper
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+
+def migrate_cover(path: Path) -> str:
+    try:
+        object_path = cover_store.put(path, path.name)
+        # Variant images stay where they are; only their index follows the
+        # cover, so cover_variants.has_variants finds it and skips the film
+        sidecar = path.with_name(f"{path.stem}.variants.json")
+        if sidecar.is_file():
+            os.replace(
+                sidecar, object_path.with_name(f"{object_path.stem}.variants.json")
+            )
+        return str(object_path)
+    except Exception as e:
+        helper.error_log(
+            f"Failed to migrate cover {path}\n{e}", log_file="migrate_covers.log"
+        )
+        return ""
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Move flat covers/ files into the content-addressed store"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--nginx-map",
+        default="",
+        help="Also write an nginx map of /covers/{name} -> object path "
+        "(COVER_NGINX_MAP, when set, is rewritten anyway)",
+    )
+    return parser.parse_args()
+
+
+def get_variant_names(covers_dir: Path) -> set:
+    names = set()
+    # Sidecars of covers already migrated live under objects/
+    for sidecar in covers_dir.rglob("*.variants.json"):
+        for sizes in json.loads(sidecar.read_text()).values():
+            names.update(Path(variant).name for variant in sizes.values())
+    return names
+
+
+def main():
+    args = get_args()
+    covers_dir = Path(CONFIG.COVER_SAVE_PATH) / "covers"
+    variant_names = get_variant_names(covers_dir)
+    # Indexed names were migrated by an earlier run; whatever is left at
+    # covers/{name} for them is not moved or hashed again
+    indexed_names = cover_store.get_names()
+    paths = [
+        path
+        for path in covers_dir.iterdir()
+        if path.is_file()
+        and not path.is_symlink()
+        and not path.name.startswith(".")
+        and path.suffix not in (".sqlite", ".json")
+        and path.name not in variant_names
+        and path.name not in indexed_names
+    ]
+    logging.info(f"Migrating {len(paths)} covers with {args.workers} workers")
+
+    migrated = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for object_path in executor.map(migrate_cover, paths):
+            if object_path:
+                migrated += 1
+            if migrated and migrated % 1000 == 0:
+                logging.info(f"[+] Migrated {migrated}/{len(paths)}")
+
+    objects = sum(
+        1
+        for path in cover_store.objects.rglob("*")
+        if path.is_file() and path.suffix != ".json"
+    )
+    logging.info(f"[+] Migrated {migrated}/{len(paths)} covers into {objects} objects")
+
+    cover_store.save_nginx_map()
+    if args.nginx_map:
+        cover_store.export_nginx_map(args.nginx_map)
+        logging.info(f"[+] Wrote {args.nginx_map}")
+
+
+if __name__ == "__main__":
+    main()
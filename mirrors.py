@@ -0,0 +1,186 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import metrics
+from proxy_pool import proxy_pool
+from settings import CONFIG
+
+
+class Mirror:
+    def __init__(self, base: str):
+        self.base = base.rstrip("/")
+        self.latency = 1.0
+        self.errors = 0.0
+
+    @property
+    def cost(self) -> float:
+        # An error costs as much as a 10s response
+        return self.latency + 10 * self.errors
+
+
+class MirrorPool:
+    """Equivalent copies of the site, canonical one first (FMOVIERS_HOMEPAGE).
+
+    URLs are always handled in canonical form and rewritten to the chosen
+    mirror only for the request, so hrefs and slugs do not depend on which
+    mirror answered. Requests go to the mirror with the lowest EWMA
+    latency + error cost, and fail over down that ranking on errors. With
+    hedge_after > 0, a request still unanswered after that many seconds is
+    duplicated to the next mirror and the first good answer wins.
+    """
+
+    def __init__(
+        self,
+        mirrors: list,
+        hedge_after: float = 0,
+        explore: float = 0.05,
+        alpha: float = 0.3,
+    ):
+        self.mirrors = [Mirror(base) for base in mirrors]
+        self.hedge_after = hedge_after
+        self.explore = explore
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.executor = None
+
+    @property
+    def canonical(self) -> Mirror:
+        return self.mirrors[0]
+
+    def find_mirror(self, url: str) -> Mirror:
+        for mirror in self.mirrors:
+            if url.startswith(mirror.base + "/") or url == mirror.base:
+                return mirror
+        return None
+
+    def rewrite(self, url: str, mirror: Mirror) -> str:
+        source = self.find_mirror(url)
+        if not source or source is mirror:
+            return url
+        return mirror.base + url[len(source.base) :]
+
+    def canonicalize(self, url: str) -> str:
+        return self.rewrite(url, self.canonical)
+
+    def get_ranked(self) -> list:
+        with self.lock:
+            ranked = sorted(self.mirrors, key=lambda mirror: mirror.cost)
+        if len(ranked) > 1 and random.random() < self.explore:
+            # Now and then try a worse mirror so its stats recover after an outage
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def record(self, mirror: Mirror, seconds: float, ok: bool):
+        with self.lock:
+            mirror.latency += self.alpha * (seconds - mirror.latency)
+            mirror.errors += self.alpha * ((not ok) - mirror.errors)
+        metrics.inc(
+            "mirror_requests_total",
+            mirror=mirror.base,
+            result="ok" if ok else "error",
+        )
+        metrics.set("mirror_latency_seconds", mirror.latency, mirror=mirror.base)
+
+    def is_good_response(self, response) -> bool:
+        return response.status_code < 500 and response.status_code != 429
+
+    def fetch(self, url: str, mirror: Mirror, headers: dict, **kwargs):
+        start = time.monotonic()
+        try:
+            response = proxy_pool.get(
+                self.rewrite(url, mirror), headers=headers, **kwargs
+            )
+        except Exception:
+            self.record(mirror, time.monotonic() - start, ok=False)
+            raise
+        self.record(
+            mirror, time.monotonic() - start, ok=self.is_good_response(response)
+        )
+        return response
+
+    def is_good(self, future) -> bool:
+        return not future.exception() and self.is_good_response(future.result())
+
+    def close_loser(self, future):
+        # A streamed response that lost the race still holds its connection
+        if not future.exception():
+            future.result().close()
+
+    def get_hedged(self, url: str, ranked: list, headers: dict, **kwargs):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=32)
+
+        def submit(mirror: Mirror):
+            return self.executor.submit(self.fetch, url, mirror, headers, **kwargs)
+
+        futures = [submit(ranked[0])]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            metrics.inc("mirror_hedges_total")
+            futures.append(submit(ranked[1]))
+        elif not self.is_good(futures[0]):
+            futures.append(submit(ranked[1]))
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if self.is_good(future):
+                    if future is not futures[0]:
+                        metrics.inc("mirror_hedge_wins_total")
+                    for loser in futures:
+                        if loser is not future:
+                            loser.add_done_callback(self.close_loser)
+                    return future.result()
+
+        # Both failed: surface the primary's answer or error
+        if len(futures) > 1:
+            futures[1].add_done_callback(self.close_loser)
+        return futures[0].result()
+
+    def get(self, url: str, headers: dict = None, **kwargs):
+        """GET from the best mirror. kwargs go to requests, e.g. stream=True."""
+        if len(self.mirrors) < 2:
+            return proxy_pool.get(url, headers=headers, **kwargs)
+
+        ranked = self.get_ranked()
+        if self.hedge_after > 0:
+            try:
+                response = self.get_hedged(url, ranked, headers, **kwargs)
+                if self.is_good_response(response) or len(ranked) == 2:
+                    return response
+                response.close()
+            except Exception:
+                if len(ranked) == 2:
+                    raise
+            ranked = ranked[2:]
+
+        for i, mirror in enumerate(ranked):
+            last = i == len(ranked) - 1
+            try:
+                response = self.fetch(url, mirror, headers, **kwargs)
+            except Exception:
+                if last:
+                    raise
+                logging.info(f"[mirror] {mirror.base} failed, trying next mirror")
+                continue
+            if self.is_good_response(response) or last:
+                return response
+            response.close()
+
+
+def get_mirrors() -> list:
+    mirrors = [CONFIG.FMOVIERS_HOMEPAGE]
+    for mirror in getattr(CONFIG, "MIRRORS", []):
+        if mirror.rstrip("/") != CONFIG.FMOVIERS_HOMEPAGE.rstrip("/"):
+            mirrors.append(mirror)
+    return mirrors
+
+
+mirror_pool = MirrorPool(
+    get_mirrors(),
+    hedge_after=getattr(CONFIG, "MIRROR_HEDGE_AFTER", 0),
+)
@@ -0,0 +1,105 @@
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from settings import CONFIG
+
+
+class PageArchive:
+    """Append-only, compressed archive of fetched pages.
+
+    Pages are zlib-compressed and appended to numbered segment files; a SQLite
+    index maps (url, fetched_at) to (segment, offset, length). Segments are
+    never rewritten, so an archive can be copied or rsynced while it grows.
+    Several crawl processes may share one archive: appends take an flock on
+    the segment and read the offset from fstat, never from a stale tell().
+    """
+
+    def __init__(self, root: str = "archive", max_segment_bytes: int = 512 << 20):
+        self.root = Path(root)
+        self.max_segment_bytes = max_segment_bytes
+        self.lock = threading.Lock()
+        self.conn = None
+        self.segment = None
+        self.segment_file = None
+
+    def get_conn(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(
+                self.root / "index.sqlite", check_same_thread=False, timeout=30
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT, kind TEXT, "
+                "fetched_at REAL, segment INTEGER, offset INTEGER, length INTEGER)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at)"
+            )
+        return self.conn
+
+    def get_segment_path(self, segment: int) -> Path:
+        return self.root / f"pages-{segment:05d}.dat"
+
+    def open_segment(self):
+        if self.segment is None:
+            row = self.get_conn().execute("SELECT MAX(segment) FROM pages").fetchone()
+            self.segment = row[0] or 1
+        path = self.get_segment_path(self.segment)
+        # Other processes may have filled several segments since
+        while path.is_file() and path.stat().st_size >= self.max_segment_bytes:
+            self.segment += 1
+            path = self.get_segment_path(self.segment)
+        self.segment_file = open(path, "ab")
+
+    def add(self, url: str, content: bytes, kind: str = ""):
+        data = zlib.compress(content, 6)
+        with self.lock:
+            if self.segment_file is None or (
+                os.fstat(self.segment_file.fileno()).st_size >= self.max_segment_bytes
+            ):
+                if self.segment_file is not None:
+                    self.segment_file.close()
+                self.open_segment()
+
+            fd = self.segment_file.fileno()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                offset = os.fstat(fd).st_size
+                self.segment_file.write(data)
+                self.segment_file.flush()
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+            conn = self.get_conn()
+            conn.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, kind, time.time(), self.segment, offset, len(data)),
+            )
+            conn.commit()
+
+    def get_latest(self, kind: str = "") -> list:
+        """[(url, segment, offset, length)] of the newest copy of every URL."""
+        with self.lock:
+            return (
+                self.get_conn()
+                .execute(
+                    "SELECT url, segment, offset, length FROM pages p "
+                    "WHERE (? = '' OR kind = ?) AND fetched_at = "
+                    "(SELECT MAX(fetched_at) FROM pages WHERE url = p.url)",
+                    (kind, kind),
+                )
+                .fetchall()
+            )
+
+    def read(self, segment: int, offset: int, length: int) -> bytes:
+        with open(self.get_segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return zlib.decompress(f.read(length))
+
+
+page_archive = PageArchive(root=getattr(CONFIG, "ARCHIVE_DIR", "archive"))
@@ -0,0 +1,305 @@
+import argparse
+import logging
+import queue
+import threading
+import time
+
+from base import Crawler
+from concurrency import AIMDController
+from film_export import film_exporter
+from hdtoday import HDToday
+from helper import helper
+from metrics import metrics
+from mirrors import mirror_pool
+from profiler import profiler
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+STOP = object()
+
+
+class Stage:
+    """A pool of threads taking items from in_queue and putting the results of
+    func(item) on out_queue. The last worker to stop passes STOP downstream."""
+
+    def __init__(self, name: str, func, workers: int, in_queue: queue.Queue):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.in_queue = in_queue
+        self.out_queue = None
+        self.next_stage = None
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.running = 0
+        self.processed = 0
+        self.threads = []
+
+    def start(self):
+        self.running = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self.run, name=f"{self.name}-{i}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def run(self):
+        while True:
+            item = self.in_queue.get()
+            if item is STOP:
+                break
+
+            with self.lock:
+                self.busy += 1
+            try:
+                with metrics.timer("pipeline_stage_seconds", stage=self.name):
+                    results = self.func(item) or []
+                for result in results:
+                    self.out_queue.put(result)
+            except Exception as e:
+                helper.error_log(
+                    f"Pipeline stage {self.name} failed\n{e}",
+                    log_file="pipeline.log",
+                )
+            finally:
+                with self.lock:
+                    self.busy -= 1
+                    self.processed += 1
+                metrics.inc("pipeline_items_total", stage=self.name)
+
+        with self.lock:
+            self.running -= 1
+            last = self.running == 0
+        if last and self.next_stage:
+            for _ in range(self.next_stage.workers):
+                self.out_queue.put(STOP)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def get_occupancy(self) -> dict:
+        with self.lock:
+            return {
+                "busy": self.busy,
+                "workers": self.workers,
+                "queued": self.in_queue.qsize(),
+                "queue_size": self.in_queue.maxsize,
+                "processed": self.processed,
+            }
+
+
+class CrawlPipeline:
+    """listing -> detail -> parse -> persist, connected by bounded queues.
+
+    The listing stage keeps walking pages while films of earlier pages are
+    still being fetched or written, until the detail queue is full. Each
+    stage's busy workers and queue depth are logged every report_interval
+    seconds and exported as pipeline_* gauges. The stage that is always busy
+    with a full input queue is the bottleneck.
+
+    With a controller, a film takes a slot before its detail fetch and gives
+    it back once persisted or dropped, so the controller's limit bounds the
+    films in flight across all stages.
+    """
+
+    def __init__(
+        self,
+        post_type: str = CONFIG.TYPE_MOVIE,
+        detail_workers: int = 8,
+        parse_workers: int = 2,
+        persist_workers: int = 2,
+        queue_size: int = 64,
+        report_interval: float = 10,
+        controller: AIMDController = None,
+    ):
+        self.post_type = post_type
+        self.controller = controller
+        self.crawler = Crawler()
+        self.report_interval = report_interval
+        self.exhausted = False
+
+        self.stages = [
+            Stage("listing", self.fetch_listing, 1, queue.Queue()),
+            Stage("detail", self.fetch_detail, detail_workers, queue.Queue(queue_size)),
+            Stage("parse", self.parse_detail, parse_workers, queue.Queue(queue_size)),
+            Stage("persist", self.persist, persist_workers, queue.Queue(queue_size)),
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.out_queue = next_stage.in_queue
+            stage.next_stage = next_stage
+
+    def fetch_listing(self, url: str) -> list:
+        if self.exhausted:
+            return []
+
+        flw_items = self.crawler.get_flw_items(url)
+        if not flw_items:
+            self.exhausted = True
+            return []
+
+        res = []
+        for flw_item in flw_items:
+            href = flw_item.find("a").get("href")
+            if not href.startswith("https://"):
+                href = CONFIG.FMOVIERS_HOMEPAGE + href
+            res.append(mirror_pool.canonicalize(href))
+        self.crawler.release(flw_items[0])
+        return res
+
+    def release(self):
+        if self.controller:
+            self.controller.release()
+
+    def fetch_detail(self, href: str) -> list:
+        if self.controller:
+            self.controller.acquire()
+        try:
+            return [(href, self.crawler.fetch_page(href, kind="detail"))]
+        except Exception:
+            self.release()
+            raise
+
+    def parse_detail(self, item: tuple) -> list:
+        href, content = item
+        try:
+            res = self.crawler.crawl_film(
+                slug=href.strip("/").split("/")[-1],
+                href=href,
+                post_type=self.post_type,
+                soup=self.crawler.parse_page(content),
+            )
+        except Exception:
+            self.release()
+            raise
+        if not res:
+            self.release()
+            return []
+
+        film_data, episodes_data = res
+        film_data.episodes_data = episodes_data
+        return [HDToday(film=film_data, episodes=episodes_data)]
+
+    def persist(self, film: HDToday) -> list:
+        try:
+            if self.crawler.mode == "export":
+                film_exporter.write(film.get_record())
+            else:
+                film.insert_film()
+            metrics.inc("films_total", post_type=self.post_type)
+        finally:
+            self.release()
+        return []
+
+    def report(self):
+        parts = []
+        for stage in self.stages:
+            occupancy = stage.get_occupancy()
+            metrics.set("pipeline_busy_workers", occupancy["busy"], stage=stage.name)
+            metrics.set("pipeline_workers", occupancy["workers"], stage=stage.name)
+            metrics.set("pipeline_queue_depth", occupancy["queued"], stage=stage.name)
+            parts.append(
+                f"{stage.name} {occupancy['busy']}/{occupancy['workers']} busy "
+                f"q={occupancy['queued']}/{occupancy['queue_size'] or '-'} "
+                f"done={occupancy['processed']}"
+            )
+        if self.controller:
+            parts.append(
+                f"films {self.controller.in_flight}/{self.controller.limit} in flight"
+            )
+        logging.info("[pipeline] " + " | ".join(parts))
+
+    def run(self, page_urls: list):
+        self.exhausted = False
+        listing = self.stages[0]
+        for url in page_urls:
+            listing.in_queue.put(url)
+        listing.in_queue.put(STOP)
+
+        for stage in self.stages:
+            stage.start()
+
+        last = self.stages[-1]
+        while True:
+            alive = [thread for thread in last.threads if thread.is_alive()]
+            if not alive:
+                break
+            alive[0].join(self.report_interval)
+            self.report()
+
+        for stage in self.stages:
+            stage.join()
+        self.report()
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Crawl listing pages through a staged fetch/parse/persist pipeline"
+    )
+    parser.add_argument("--type", choices=["movie", "tv"], default="movie")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--end", type=int, default=0, help="Default: *_LAST_PAGE")
+    parser.add_argument("--detail-workers", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=2)
+    parser.add_argument("--persist-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--report-interval", type=float, default=10)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="AIMD limit on films in flight, up to --detail-workers",
+    )
+    parser.add_argument("--min-films", type=int, default=2)
+    parser.add_argument(
+        "--fetch-target", type=float, default=2.0, help="p90 fetch seconds"
+    )
+    parser.add_argument(
+        "--db-target", type=float, default=0.2, help="p90 query seconds"
+    )
+    parser.add_argument(
+        "--loop", action="store_true", help="Start over after the last page"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    metrics.start()
+    profiler.install_signal()
+
+    if args.type == "tv":
+        post_type = CONFIG.TYPE_TV_SHOWS
+        base_url = CONFIG.FMOVIERS_TVSHOWS_PAGE
+        last_page = args.end or CONFIG.FMOVIERS_TVSHOWS_LAST_PAGE
+    else:
+        post_type = CONFIG.TYPE_MOVIE
+        base_url = CONFIG.FMOVIERS_MOVIES_PAGE
+        last_page = args.end or CONFIG.FMOVIERS_MOVIES_LAST_PAGE
+
+    controller = None
+    if args.adaptive:
+        controller = AIMDController(
+            initial=args.min_films,
+            minimum=args.min_films,
+            maximum=args.detail_workers,
+            targets={"fetch": args.fetch_target, "db": args.db_target},
+        ).attach()
+
+    page_urls = [f"{base_url}/page/{i}/" for i in range(args.start, last_page + 1)]
+    while True:
+        CrawlPipeline(
+            post_type=post_type,
+            detail_workers=args.detail_workers,
+            parse_workers=args.parse_workers,
+            persist_workers=args.persist_workers,
+            queue_size=args.queue_size,
+            report_interval=args.report_interval,
+            controller=controller,
+        ).run(page_urls)
+        if not args.loop:
+            break
+        time.sleep(CONFIG.WAIT_BETWEEN_ALL)
+
+    film_exporter.close()
@@ -0,0 +1,144 @@
+import cProfile
+import functools
+import heapq
+import io
+import logging
+import os
+import pstats
+import random
+import signal
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from settings import CONFIG
+
+
+class FilmProfiler:
+    """Opt-in cProfile capture of the slowest films.
+
+    Enabled with CRAWL_PROFILE=1 (or CONFIG.PROFILE_FILMS), toggled at runtime
+    with SIGUSR1. While enabled, a sample of films is profiled and the N slowest
+    of every window are dumped to profiles/ with their slug and URL. While
+    disabled the wrapped call costs two attribute checks.
+
+    The signal handler only sets `toggled`: it may interrupt a thread that
+    holds the lock, so the next wrapped call applies the toggle and dumps.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        keep: int = 5,
+        window: float = 600,
+        save_dir: str = "profiles",
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.window = window
+        self.save_dir = Path(save_dir)
+        self.slowest = []
+        self.window_start = time.monotonic()
+        self.toggled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def toggle(self, *_):
+        self.toggled = True
+
+    def apply_toggle(self):
+        with self.lock:
+            if not self.toggled:
+                return
+            self.toggled = False
+            self.enabled = not self.enabled
+        logging.info(f"Film profiling {'enabled' if self.enabled else 'disabled'}")
+        if not self.enabled:
+            self.dump()
+
+    def install_signal(self):
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self.toggle)
+
+    def profile_film(self, get_label):
+        """Decorator. get_label(*args, **kwargs) returns (slug, url) of the film."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.toggled:
+                    self.apply_toggle()
+                if (
+                    not self.enabled
+                    or getattr(self.local, "active", False)
+                    or random.random() >= self.sample_rate
+                ):
+                    return func(*args, **kwargs)
+
+                profile = cProfile.Profile()
+                self.local.active = True
+                start = time.perf_counter()
+                try:
+                    return profile.runcall(func, *args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self.local.active = False
+                    try:
+                        slug, url = get_label(*args, **kwargs)
+                    except Exception:
+                        slug, url = func.__name__, ""
+                    self.record(elapsed, slug, url, func.__qualname__, profile)
+
+            return wrapper
+
+        return decorator
+
+    def record(self, elapsed: float, slug: str, url: str, name: str, profile):
+        with self.lock:
+            entry = (elapsed, id(profile), slug, url, name, profile)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+            window_over = time.monotonic() - self.window_start >= self.window
+
+        if window_over:
+            self.dump()
+
+    def dump(self):
+        with self.lock:
+            slowest, self.slowest = self.slowest, []
+            self.window_start = time.monotonic()
+        if not slowest:
+            return
+
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        for elapsed, _, slug, url, name, profile in sorted(slowest, reverse=True):
+            base = self.save_dir / f"{stamp}_{elapsed:.2f}s_{slug}"
+            profile.dump_stats(f"{base}.prof")
+
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(
+                40
+            )
+            with open(f"{base}.txt", "w") as f:
+                print(f"slug: {slug}\nurl: {url}\ncall: {name}", file=f)
+                print(f"elapsed: {elapsed:.3f}s\n", file=f)
+                f.write(summary.getvalue())
+
+        logging.info(f"[+] Dumped {len(slowest)} film profiles to {self.save_dir}")
+
+
+profiler = FilmProfiler(
+    enabled=os.environ.get("CRAWL_PROFILE", "") in ("1", "true")
+    or getattr(CONFIG, "PROFILE_FILMS", False),
+    sample_rate=float(
+        os.environ.get("CRAWL_PROFILE_SAMPLE", getattr(CONFIG, "PROFILE_SAMPLE", 1.0))
+    ),
+    keep=getattr(CONFIG, "PROFILE_KEEP", 5),
+    window=getattr(CONFIG, "PROFILE_WINDOW", 600),
+)
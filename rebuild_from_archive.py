@@ -0,0 +1,112 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from base import Crawler
+from cover_pool import cover_pool
+from film_export import film_exporter
+from hdtoday import HDToday
+from helper import helper
+from page_archive import page_archive
+from records import iter_batches
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+
+class ArchiveCrawler(Crawler):
+    """Crawler that parses one archived page instead of fetching it."""
+
+    def __init__(self, html: bytes):
+        super().__init__()
+        self.html = html
+
+    def crawl_soup(self, url, kind: str = ""):
+        return BeautifulSoup(self.html, "html.parser")
+
+
+def parse_archived(entry: tuple):
+    """Runs in a worker process: re-runs crawl_film over an archived detail page."""
+    url, segment, offset, length = entry
+    try:
+        html = page_archive.read(segment, offset, length)
+        slug = url.strip("/").split("/")[-1]
+        res = ArchiveCrawler(html).crawl_film(
+            slug=slug, href=url, post_type=helper.get_post_type_from(url)
+        )
+        return res[0] if res else None
+    except Exception as e:
+        helper.error_log(
+            f"Failed to parse archived page {url}\n{e}",
+            log_file="rebuild_from_archive.log",
+        )
+        return None
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Rebuild film rows from archived detail pages, without network"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["insert", "export"],
+        default="insert",
+        help="insert: write through HDToday; export: JSONL for load_export.py",
+    )
+    parser.add_argument(
+        "--update-existing",
+        action="store_true",
+        help="Also rewrite crawled columns of movies that already exist",
+    )
+    parser.add_argument(
+        "--fetch-covers",
+        action="store_true",
+        help="Download covers that are not on disk (default: keep the URL only)",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=32)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    entries = page_archive.get_latest(kind="detail")
+    logging.info(f"Rebuilding {len(entries)} films from {page_archive.root}")
+
+    start = time.perf_counter()
+    done = 0
+    # map() per batch keeps at most batch_size parsed records alive at once
+    batch_size = args.chunksize * (args.workers or os.cpu_count() or 1) * 4
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for batch in iter_batches(entries, batch_size):
+            for film_data in executor.map(
+                parse_archived, batch, chunksize=args.chunksize
+            ):
+                if not film_data:
+                    continue
+
+                film = HDToday(
+                    film=film_data, episodes=[], fetch_cover=args.fetch_covers
+                )
+                if args.mode == "export":
+                    film_exporter.write(film.get_record())
+                else:
+                    film.insert_film(update_existing=args.update_existing)
+
+                done += 1
+                if done % 500 == 0:
+                    rate = done / (time.perf_counter() - start)
+                    logging.info(
+                        f"[+] Rebuilt {done}/{len(entries)} ({rate:.1f} films/s)"
+                    )
+
+    cover_pool.wait()
+    film_exporter.close()
+    logging.info(f"[+] Rebuilt {done} films in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
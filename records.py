@@ -0,0 +1,176 @@
+"""Slotted records that carry a film from extraction to persistence.
+
+A crawled film used to be copied through three or four dicts (film_data,
+post_data, movie); these records replace them with one fixed-layout object
+per stage. Item access (film["slug"]) still works for older callers.
+"""
+from itertools import islice
+
+# Detail page "extra info" keys feeding each movie field; later keys win.
+EXTRA_INFO_KEYS = {
+    "imdb": ("imdb",),
+    "duration": ("Duration",),
+    "genre": ("Genre",),
+    "cast": ("Casts", "Starring"),
+    "director": ("Creator", "Created by", "Director"),
+    "country": ("Country",),
+    "year": ("Year",),
+}
+
+
+class Record:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __getstate__(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state):
+        for key, value in zip(self.__slots__, state):
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class FilmRecord(Record):
+    __slots__ = (
+        "title",
+        "slug",
+        "href",
+        "description",
+        "post_type",
+        "trailer_id",
+        "cover_src",
+        "origin_cover_src",
+        "servers_link",
+        "extra_info",
+        "quality",
+        "tmdb_id",
+        "episodes_data",
+    )
+
+    def __init__(
+        self,
+        title: str,
+        slug: str,
+        href: str,
+        description: str,
+        post_type: str,
+        trailer_id: str,
+        cover_src: str,
+        servers_link: list,
+        extra_info: dict,
+        episodes_data: list = None,
+    ):
+        self.title = title
+        self.slug = slug
+        self.href = href
+        self.description = description
+        self.post_type = post_type
+        self.trailer_id = trailer_id
+        self.cover_src = cover_src
+        self.origin_cover_src = cover_src
+        self.servers_link = servers_link
+        self.extra_info = extra_info
+        self.quality = extra_info.get("quality", "HD")
+        self.tmdb_id = extra_info.get("tmdb_id", "")
+        self.episodes_data = episodes_data or []
+
+    @property
+    def post_title(self) -> str:
+        return self.title
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FilmRecord":
+        return cls(
+            title=data["title"],
+            slug=data["slug"],
+            href=data.get("href", ""),
+            description=data.get("description", ""),
+            post_type=data["post_type"],
+            trailer_id=data.get("trailer_id", ""),
+            cover_src=data.get("cover_src", ""),
+            servers_link=data.get("servers_link", []),
+            extra_info=data.get("extra_info", {}),
+            episodes_data=data.get("episodes_data", []),
+        )
+
+    def get_extra(self, field: str, default=""):
+        value = default
+        for key in EXTRA_INFO_KEYS[field]:
+            if key in self.extra_info:
+                value = self.extra_info[key]
+        return value
+
+
+class MovieRecord(Record):
+    """One `movie` row; slot order is the column order of CONFIG.INSERT["movie"]."""
+
+    __slots__ = (
+        "name",
+        "origin_name",
+        "thumb",
+        "keyword",
+        "genre",
+        "cast",
+        "country",
+        "director",
+        "duration",
+        "trailer",
+        "quality",
+        "year",
+        "slug",
+        "content",
+        "type",
+        "status",
+        "imdb",
+        "liked",
+        "disliked",
+        "view",
+        "view_d",
+        "view_m",
+        "view_w",
+        "view_y",
+        "time",
+    )
+
+    def __init__(self, **columns):
+        for key in self.__slots__:
+            setattr(self, key, columns.get(key, 0))
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+
+class PlayerRecord(Record):
+    __slots__ = ("server_name", "server_type", "server_link")
+
+    def __init__(self, server_name: str, server_link: str, server_type: str = "embed"):
+        self.server_name = server_name
+        self.server_type = server_type
+        self.server_link = server_link
+
+
+def iter_batches(records, batch_size: int):
+    """Yields lists of at most batch_size records without materializing the input."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
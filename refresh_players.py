@@ -0,0 +1,277 @@
+import argparse
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _db import database
+from base import Crawler
+from hdtoday import HDToday
+from helper import helper
+from metrics import metrics
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+
+class RefreshState:
+    """When each film's player was last checked, and whether it was broken.
+
+    Kept in a local SQLite file rather than in `movie`, so refreshing does not
+    touch `movie.time`, which the site sorts "recently updated" by. `due_at`
+    is fixed at check time from the views and result of that check.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def get_conn(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS players (movie_id INTEGER PRIMARY KEY, "
+                "checked_at REAL, broken INTEGER, changed_at REAL, due_at REAL, "
+                "type TEXT)"
+            )
+            columns = [
+                row[1] for row in self.conn.execute("PRAGMA table_info(players)")
+            ]
+            # State files from before due_at: those films are due right away
+            for column in ("due_at REAL", "type TEXT"):
+                if column.split()[0] not in columns:
+                    self.conn.execute(f"ALTER TABLE players ADD COLUMN {column}")
+        return self.conn
+
+    def get_due(self, now: float, limit: int, post_type: str = "") -> list:
+        """[(overdue_seconds, movie_id)] of checked films, most overdue first."""
+        with self.lock:
+            return (
+                self.get_conn()
+                .execute(
+                    "SELECT ? - COALESCE(due_at, 0) AS overdue, movie_id FROM players "
+                    "WHERE COALESCE(due_at, 0) <= ? "
+                    "AND (? = '' OR type IS NULL OR type = ?) "
+                    "ORDER BY overdue DESC LIMIT ?",
+                    (now, now, post_type, post_type, limit),
+                )
+                .fetchall()
+            )
+
+    def get_checked_ids(self) -> list:
+        with self.lock:
+            rows = self.get_conn().execute("SELECT movie_id FROM players").fetchall()
+        return [movie_id for (movie_id,) in rows]
+
+    def set(
+        self,
+        movie_id: int,
+        broken: bool,
+        changed: bool,
+        interval: float,
+        post_type: str,
+    ):
+        now = time.time()
+        with self.lock:
+            conn = self.get_conn()
+            conn.execute(
+                "INSERT INTO players VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(movie_id) "
+                "DO UPDATE SET checked_at=excluded.checked_at, "
+                "broken=excluded.broken, "
+                "changed_at=COALESCE(excluded.changed_at, changed_at), "
+                "due_at=excluded.due_at, type=excluded.type",
+                (
+                    movie_id,
+                    now,
+                    int(broken),
+                    now if changed else None,
+                    now + interval * 3600,
+                    post_type,
+                ),
+            )
+            conn.commit()
+
+
+class PlayerRefresher:
+    """Re-fetches detail pages of existing films, stalest and most watched first.
+
+    A film is due once `interval` hours have passed since it was last checked
+    (or since `movie.time` if it never was). The interval shrinks with weekly
+    views, and films whose last check found no links are retried after
+    `broken_interval` hours.
+    """
+
+    def __init__(
+        self,
+        interval: float = 72,
+        broken_interval: float = 6,
+        min_interval: float = 6,
+        workers: int = 4,
+    ):
+        self.interval = interval
+        self.broken_interval = broken_interval
+        self.min_interval = min_interval
+        self.workers = workers
+        self.crawler = Crawler()
+        self.state = RefreshState(
+            getattr(CONFIG, "REFRESH_STATE_FILE", "refresh_state.sqlite")
+        )
+
+    def get_interval(self, views: int, broken: bool) -> float:
+        if broken:
+            return self.broken_interval
+        interval = self.interval / (1 + math.log10(1 + max(views or 0, 0)))
+        return max(interval, self.min_interval)
+
+    def get_unchecked_due(self, post_type: str, now: float, limit: int) -> list:
+        """[(overdue_seconds, id)] of films never checked, due from movie.time."""
+        # Same curve as get_interval, evaluated by MariaDB
+        next_at = (
+            f"COALESCE(UNIX_TIMESTAMP(time), 0) + GREATEST({float(self.min_interval)}, "
+            f"{float(self.interval)} / "
+            "(1 + LOG10(1 + GREATEST(COALESCE(view_w, 0), 0)))) * 3600"
+        )
+        conditions = [f"{next_at} <= {now}"]
+        if post_type:
+            conditions.append(f"type='{post_type}'")
+        checked_ids = self.state.get_checked_ids()
+        if checked_ids:
+            conditions.append(f"id NOT IN ({', '.join(map(str, checked_ids))})")
+        return database.select_with(
+            f"SELECT {now} - ({next_at}) AS overdue, id "
+            f"FROM {CONFIG.TABLE_PREFIX}movie WHERE {' AND '.join(conditions)} "
+            f"ORDER BY overdue DESC LIMIT {int(limit)}"
+        )
+
+    def get_due_films(self, post_type: str = "", limit: int = 500) -> list:
+        """[(overdue_seconds, id, slug, type, views)] of due films, most overdue
+        first.
+
+        Both sources are filtered, ordered and limited in SQL: checked films
+        by the due_at stored with their last check, the others by movie.time.
+        """
+        now = time.time()
+        due = [
+            (float(overdue), movie_id)
+            for overdue, movie_id in self.get_unchecked_due(post_type, now, limit)
+        ]
+        due += self.state.get_due(now, limit, post_type=post_type)
+        due.sort(reverse=True)
+        if not due:
+            return []
+
+        condition = f"id IN ({', '.join(str(movie_id) for _, movie_id in due)})"
+        if post_type:
+            condition += f" AND type='{post_type}'"
+        films = {
+            row[0]: row[1:]
+            for row in database.select_all_from(
+                table="movie", condition=condition, cols="id, slug, type, view_w"
+            )
+        }
+        return [
+            (overdue, movie_id, *films[movie_id])
+            for overdue, movie_id in due
+            if movie_id in films
+        ][:limit]
+
+    def get_href(self, slug: str, post_type: str) -> str:
+        kind = "tv" if post_type == CONFIG.TYPE_TV_SHOWS else "movie"
+        return f"{CONFIG.FMOVIERS_HOMEPAGE}/{kind}/{slug}"
+
+    def has_servers(self, film: HDToday) -> bool:
+        """Whether the player that would be written has any server, including
+        the vidsrc one added from tmdb_id."""
+        return any(
+            episode["episode_server"]
+            for season in json.loads(film.get_player_data())
+            for episode in season["episode_list"]
+        )
+
+    def refresh(self, movie_id: int, slug: str, post_type: str, views: int) -> str:
+        href = self.get_href(slug, post_type)
+        try:
+            res = self.crawler.crawl_film(slug=slug, href=href, post_type=post_type)
+            film = HDToday(film=res[0], episodes=[]) if res and res[0] else None
+            if not film or not self.has_servers(film):
+                result = "broken"
+            else:
+                result = "changed" if film.insert_player(movie_id) else "unchanged"
+        except Exception as e:
+            helper.error_log(
+                f"Failed to refresh player {movie_id}. Href: {href}\n{e}",
+                log_file="refresh_players.log",
+            )
+            result = "broken"
+
+        broken = result == "broken"
+        self.state.set(
+            movie_id,
+            broken=broken,
+            changed=result == "changed",
+            interval=self.get_interval(views, broken),
+            post_type=post_type,
+        )
+        metrics.inc("player_refresh_total", result=result)
+        return result
+
+    def run(self, post_type: str = "", limit: int = 500) -> dict:
+        due = self.get_due_films(post_type=post_type, limit=limit)
+        logging.info(f"[+] {len(due)} players due for refresh")
+
+        results = {"changed": 0, "unchanged": 0, "broken": 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self.refresh, movie_id, slug, film_type, views)
+                for _, movie_id, slug, film_type, views in due
+            ]
+            for future in futures:
+                results[future.result()] += 1
+
+        logging.info(f"[+] Refreshed {len(due)} players: {results}")
+        return results
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Refresh player links of existing films by staleness and views"
+    )
+    parser.add_argument(
+        "--type", default="", help=f"{CONFIG.TYPE_MOVIE} or {CONFIG.TYPE_TV_SHOWS}"
+    )
+    parser.add_argument("--limit", type=int, default=500, help="Films per pass")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--interval", type=float, default=72, help="Hours between checks at 0 views"
+    )
+    parser.add_argument("--min-interval", type=float, default=6)
+    parser.add_argument(
+        "--broken-interval",
+        type=float,
+        default=6,
+        help="Hours before a film with no links is checked again",
+    )
+    parser.add_argument(
+        "--loop", type=float, default=0, help="Repeat every N seconds (0: run once)"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    metrics.start()
+    refresher = PlayerRefresher(
+        interval=args.interval,
+        broken_interval=args.broken_interval,
+        min_interval=args.min_interval,
+        workers=args.workers,
+    )
+    while True:
+        refresher.run(post_type=args.type, limit=args.limit)
+        if not args.loop:
+            break
+        time.sleep(args.loop)
@@ -0,0 +1,217 @@
+import argparse
+import gzip
+import logging
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from base import Crawler
+from film_export import film_exporter
+from hdtoday import HDToday
+from helper import helper
+from metrics import metrics
+from mirrors import mirror_pool
+from profiler import profiler
+from proxy_pool import proxy_pool
+from records import iter_batches
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+
+def get_tag(element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+class SitemapState:
+    """lastmod of every sitemap file and film URL already synced."""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY, lastmod TEXT)"
+        )
+
+    def get(self, url: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT lastmod FROM seen WHERE url=?", (url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_changed(self, url: str, lastmod: str) -> bool:
+        stored = self.get(url)
+        return stored is None or (bool(lastmod) and stored != lastmod)
+
+    def set(self, url: str, lastmod: str):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO seen VALUES (?, ?)", (url, lastmod or "")
+            )
+            self.conn.commit()
+
+
+class SitemapCrawler:
+    """Finds new or modified films from the sitemap index instead of listings.
+
+    Sitemaps are parsed with iterparse straight off the response stream
+    (gunzipped on the fly for *.gz), so memory stays flat however large the
+    catalogue. Child sitemaps whose <lastmod> has not changed since the last
+    sync are not downloaded again.
+    """
+
+    def __init__(self, state_file: str = "sitemap_state.sqlite", workers: int = 4):
+        self.crawler = Crawler()
+        self.state = SitemapState(state_file)
+        self.workers = workers
+        self.pending_sitemaps = []
+
+    def open_stream(self, url: str):
+        response = proxy_pool.get(url, headers=helper.get_header(), stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        content_type = response.headers.get("Content-Type", "")
+        if url.endswith(".gz") or "gzip" in content_type:
+            return response, gzip.GzipFile(fileobj=response.raw)
+        return response, response.raw
+
+    def iter_entries(self, url: str, force: bool = False, parents: tuple = ()):
+        """Yields (film url, lastmod, sitemaps it came through) of changed films,
+        recursing into indexes."""
+        logging.info(f"Reading sitemap {url}")
+        metrics.inc("sitemap_files_total")
+        sitemaps = parents + (url,)
+        response, stream = self.open_stream(url)
+        children = []
+        with response:
+            root = None
+            loc, lastmod = "", ""
+            for event, element in ET.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = element
+                    continue
+
+                tag = get_tag(element)
+                if tag == "loc":
+                    loc = (element.text or "").strip()
+                elif tag == "lastmod":
+                    lastmod = (element.text or "").strip()
+                elif tag in ("url", "sitemap"):
+                    if tag == "sitemap":
+                        children.append((loc, lastmod))
+                    elif "/movie/" in loc or "/tv/" in loc:
+                        loc = mirror_pool.canonicalize(loc)
+                        metrics.inc("sitemap_urls_total")
+                        if force or self.state.is_changed(loc, lastmod):
+                            yield loc, lastmod, sitemaps
+                    loc, lastmod = "", ""
+                    # Drops the finished entry from the root too, not just
+                    # its children
+                    root.clear()
+
+        for child, lastmod in children:
+            if not force and not self.state.is_changed(child, lastmod):
+                continue
+            yield from self.iter_entries(child, force=force, parents=sitemaps)
+            # Recorded after its films were yielded, i.e. consumed
+            self.pending_sitemaps.append((child, lastmod))
+
+    def sync_film(self, url: str, lastmod: str) -> bool:
+        post_type = helper.get_post_type_from(url)
+        try:
+            res = self.crawler.crawl_film(
+                slug=url.strip("/").split("/")[-1], href=url, post_type=post_type
+            )
+            if not res:
+                return False
+
+            film_data, episodes_data = res
+            film = HDToday(film=film_data, episodes=episodes_data)
+            if self.crawler.mode == "export":
+                film_exporter.write(film.get_record())
+            else:
+                # A changed lastmod on a film we already have means its details moved
+                film.insert_film(update_existing=self.state.get(url) is not None)
+            self.state.set(url, lastmod)
+            metrics.inc("films_total", post_type=post_type)
+            return True
+        except Exception as e:
+            helper.error_log(
+                f"Failed to sync {url} from sitemap\n{e}",
+                log_file="sitemap_crawl.log",
+            )
+            return False
+
+    def run(self, index_url: str, force: bool = False) -> int:
+        start = time.perf_counter()
+        self.pending_sitemaps = []
+        synced = failed = 0
+        failed_sitemaps = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch in iter_batches(
+                self.iter_entries(index_url, force=force), self.workers * 8
+            ):
+                results = executor.map(
+                    lambda entry: self.sync_film(entry[0], entry[1]), batch
+                )
+                for (_, _, sitemaps), ok in zip(batch, results):
+                    synced += ok
+                    if not ok:
+                        failed += 1
+                        failed_sitemaps.update(sitemaps)
+                # Only mark sitemaps done once their films are all through;
+                # one with a failed film is read again on the next run
+                for child, lastmod in self.pending_sitemaps:
+                    if child not in failed_sitemaps:
+                        self.state.set(child, lastmod)
+                self.pending_sitemaps = []
+
+        logging.info(
+            f"[+] Synced {synced} films from sitemaps ({failed} failed) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        return synced
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Sync new or modified films from the site's sitemaps"
+    )
+    parser.add_argument(
+        "--sitemap",
+        default="",
+        help="Sitemap index URL (default: SITEMAP_URL or <homepage>/sitemap.xml)",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--force", action="store_true", help="Ignore stored lastmod values"
+    )
+    parser.add_argument(
+        "--loop", type=float, default=0, help="Repeat every N seconds (0: run once)"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    metrics.start()
+    profiler.install_signal()
+
+    index_url = args.sitemap or getattr(
+        CONFIG, "SITEMAP_URL", f"{CONFIG.FMOVIERS_HOMEPAGE}/sitemap.xml"
+    )
+    sitemap_crawler = SitemapCrawler(
+        state_file=getattr(CONFIG, "SITEMAP_STATE_FILE", "sitemap_state.sqlite"),
+        workers=args.workers,
+    )
+    while True:
+        sitemap_crawler.run(index_url, force=args.force)
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+    film_exporter.close()
@@ -2,6 +2,9 @@ import logging
 import time
 
 from base import Crawler
+from memory_guard import memory_guard
+from metrics import metrics
+from profiler import profiler
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
@@ -9,12 +12,16 @@ logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=loggin
 crawler = Crawler()
 
 if __name__ == "__main__":
-    i = 2
+    metrics.start()
+    profiler.install_signal()
+    i = memory_guard.get_resume("page", 2)
     while True:
         try:
             crawled_page = crawler.crawl_page(
                 f"{CONFIG.FMOVIERS_TVSHOWS_PAGE}/page/{i}/"
             )
+            # Re-execs past MAX_RSS_MB; an unfinished page is crawled again
+            memory_guard.checkpoint(page=i)
 
             if not crawled_page and i >= CONFIG.FMOVIERS_TVSHOWS_LAST_PAGE:
                 i = 2
@@ -1,21 +1,197 @@
+import json
 import logging
 import time
+from datetime import datetime
+from pathlib import Path
 
 from base import Crawler
+from memory_guard import memory_guard
+from metrics import metrics
+from profiler import profiler
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 
 
+class ChangeRateEstimator:
+    """Changes per second of one feed, estimated separately per hour of day.
+
+    Each poll adds its elapsed seconds (exposure) and whether the first page
+    changed to the current hour's bucket; older observations decay, so the
+    estimate follows the site's release schedule. Empty buckets fall back to
+    the prior of one change per WAIT_BETWEEN_LATEST.
+    """
+
+    def __init__(
+        self, prior_interval: float, prior_weight: float = 3600, decay: float = 0.98
+    ):
+        self.prior_rate = 1 / prior_interval
+        self.prior_weight = prior_weight
+        self.decay = decay
+        self.changes = [0.0] * 24
+        self.exposure = [0.0] * 24
+
+    def update(self, elapsed: float, changed: bool, hour: int):
+        self.changes[hour] = self.changes[hour] * self.decay + changed
+        self.exposure[hour] = self.exposure[hour] * self.decay + elapsed
+
+    def get_rate(self, hour: int) -> float:
+        return (self.changes[hour] + self.prior_rate * self.prior_weight) / (
+            self.exposure[hour] + self.prior_weight
+        )
+
+    def to_dict(self) -> dict:
+        return {"changes": self.changes, "exposure": self.exposure}
+
+    def load(self, data: dict):
+        self.changes = data.get("changes", self.changes)
+        self.exposure = data.get("exposure", self.exposure)
+
+
+class Feed:
+    """First page of one listing, polled when a change is probably waiting.
+
+    Films that are new on the first page, or that moved up past a film that
+    was above them on the previous poll (a show bumped by a new episode), are
+    crawled; either counts as a change. The next poll comes after
+    1 / (rate * polls_per_change) seconds, clamped to [min_interval,
+    max_interval].
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        post_type: str,
+        min_interval: float,
+        max_interval: float,
+        polls_per_change: float = 2,
+    ):
+        self.name = name
+        self.url = url
+        self.post_type = post_type
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.polls_per_change = polls_per_change
+        self.estimator = ChangeRateEstimator(prior_interval=CONFIG.WAIT_BETWEEN_LATEST)
+        self.slugs = None
+        self.last_poll = 0
+        self.next_poll = 0
+
+    def get_interval(self, hour: int) -> float:
+        interval = 1 / (self.estimator.get_rate(hour) * self.polls_per_change)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def get_changed_slugs(self, slugs: list) -> list:
+        """New slugs and slugs now ahead of one that preceded them last poll."""
+        if self.slugs is None:
+            return list(slugs)
+
+        positions = {slug: i for i, slug in enumerate(self.slugs)}
+        changed = []
+        lowest_below = len(positions)
+        for slug in reversed(slugs):
+            if slug not in positions:
+                changed.append(slug)
+                continue
+            if positions[slug] > lowest_below:
+                changed.append(slug)
+            lowest_below = min(lowest_below, positions[slug])
+        changed.reverse()
+        return changed
+
+    def poll(self, crawler: Crawler):
+        now = time.time()
+        hour = datetime.now().hour
+
+        flw_items = crawler.get_flw_items(self.url)
+        items = {
+            flw_item.find("a").get("href").strip("/").split("/")[-1]: flw_item
+            for flw_item in flw_items
+        }
+        changed_slugs = self.get_changed_slugs(list(items))
+        changed = self.slugs is not None and bool(changed_slugs)
+        if flw_items:
+            if self.last_poll and self.slugs is not None:
+                self.estimator.update(now - self.last_poll, changed, hour)
+            self.slugs = list(items)
+        self.last_poll = now
+
+        try:
+            for i, slug in enumerate(changed_slugs):
+                crawler.crawl_ml_item(flw_item=items[slug], post_type=self.post_type)
+                if memory_guard.check():
+                    # Left out of the seen slugs, so the next poll crawls them
+                    skipped = set(changed_slugs[i + 1 :])
+                    self.slugs = [seen for seen in self.slugs if seen not in skipped]
+                    break
+        finally:
+            if flw_items:
+                crawler.release(flw_items[0])
+
+        interval = self.get_interval(hour)
+        self.next_poll = time.time() + interval
+        metrics.inc("feed_polls_total", feed=self.name, changed=changed)
+        metrics.set("feed_interval_seconds", interval, feed=self.name)
+        logging.info(
+            f"[feed] {self.name}: {len(changed_slugs)} new or bumped, "
+            f"next poll in {interval:.0f}s"
+        )
+
+
+def load_state(feeds: list, path: Path):
+    if not path.is_file():
+        return
+    state = json.loads(path.read_text())
+    for feed in feeds:
+        if feed.name in state:
+            feed.estimator.load(state[feed.name])
+            if "slugs" in state[feed.name]:
+                feed.slugs = state[feed.name]["slugs"]
+
+
+def save_state(feeds: list, path: Path):
+    state = {}
+    for feed in feeds:
+        state[feed.name] = feed.estimator.to_dict()
+        if feed.slugs is not None:
+            state[feed.name]["slugs"] = feed.slugs
+    path.write_text(json.dumps(state))
+
+
 crawler = Crawler()
 
 if __name__ == "__main__":
+    metrics.start()
+    profiler.install_signal()
+
+    min_interval = getattr(CONFIG, "FEED_MIN_INTERVAL", 60)
+    max_interval = getattr(CONFIG, "FEED_MAX_INTERVAL", 3600)
+    state_file = Path(getattr(CONFIG, "FEED_STATE_FILE", "feed_state.json"))
+    feeds = [
+        Feed(
+            "tv",
+            f"{CONFIG.FMOVIERS_TVSHOWS_PAGE}/",
+            CONFIG.TYPE_TV_SHOWS,
+            min_interval,
+            max_interval,
+        ),
+        Feed(
+            "movie",
+            f"{CONFIG.FMOVIERS_MOVIES_PAGE}/",
+            CONFIG.TYPE_MOVIE,
+            min_interval,
+            max_interval,
+        ),
+    ]
+    load_state(feeds, state_file)
+
     while True:
+        feed = min(feeds, key=lambda feed: feed.next_poll)
+        time.sleep(max(0, feed.next_poll - time.time()))
         try:
-            crawler.crawl_page(f"{CONFIG.FMOVIERS_TVSHOWS_PAGE}/")
-            crawler.crawl_page(
-                f"{CONFIG.FMOVIERS_MOVIES_PAGE}/", post_type=CONFIG.TYPE_MOVIE
-            )
+            feed.poll(crawler)
+            save_state(feeds, state_file)
+            memory_guard.checkpoint()
         except Exception as e:
-            pass
-        time.sleep(CONFIG.WAIT_BETWEEN_LATEST)
+            feed.next_poll = time.time() + min_interval